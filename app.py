@@ -1,19 +1,21 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 import os
-import time
+import requests
 from dotenv import load_dotenv
 import base64
 from io import BytesIO
-import requests
-import json
 
 # Import utility modules
-from utils.airtable_client import AirtableClient
+from utils.airtable_client import get_client
+from utils.airtable_mirror import get_mirror
+from utils.company_store import get_company_store
 from utils.email_sender import send_email
 from utils.analytics import log_view, display_analytics
-from utils.pdf_generator import generate_pdf
+from utils import pdf_generator
+from utils import image_jobs
+from utils.image_webhook import check_image_status
+from utils.status_prewarm import start_background_prewarm
 
 # Load environment variables
 load_dotenv()
@@ -36,107 +38,106 @@ if 'generated_images' not in st.session_state:
     st.session_state.generated_images = {}
 if 'generated_idea' not in st.session_state:
     st.session_state.generated_idea = None
-if 'force_refresh' not in st.session_state:
-    st.session_state.force_refresh = False
 if 'anchor' not in st.session_state:
     st.session_state.anchor = None
+if 'image_job_id' not in st.session_state:
+    st.session_state.image_job_id = None
+if 'image_job_notice' not in st.session_state:
+    st.session_state.image_job_notice = None
 
-# Check if we need to force a refresh due to image generation
-if st.session_state.force_refresh:
-    # Reset the flag
-    st.session_state.force_refresh = False
-    # Ensure rerun happens only once
-    st.rerun()
-
-# Initialize Airtable client
-airtable_client = AirtableClient(
+# Get the shared Airtable client (IDs are resolved once per process and cached on disk)
+airtable_client = get_client(
     pat=os.getenv("AIRTABLE_PAT"),
     base_name="Chamber of Commerce List",
     table_name="Chamber-BS"
 )
 
-# Get all records from Airtable
-@st.cache_data(ttl=300)  # Cache data for 5 minutes
-def get_companies():
-    return airtable_client.get_all_records()
+# Fields needed for the sidebar and the featured companies grid; everything else
+# (AI suggestions, visual descriptions, attachments) is loaded per company on demand
+DIRECTORY_FIELDS = ["Company Name", "Website"]
 
-# Function to check for existing images via webhook
-def check_image_status(company_name):
-    webhook_url = "https://hook.eu2.make.com/z31ifl3yfwdpu23bgbefzy96q5xr5zun"
-    
-    # Call with idea_number set to 0 to just check status
-    payload = {
-        "company_name": company_name,
-        "idea_number": 0,
-        "description": ""
+# Maximum number of matches offered by the company finder
+SEARCH_RESULT_LIMIT = 20
+
+# Get the slim company directory (records plus search index) from the shared, read-only
+# company store. The store is fed from the local Airtable mirror and refreshed in the
+# background, so this never blocks.
+def get_company_snapshot():
+    return get_company_store(get_mirror(airtable_client, fields=DIRECTORY_FIELDS)).snapshot
+
+# Check every company's image status in the background so first visits render from cache
+start_background_prewarm(lambda: get_company_snapshot().index.names)
+
+# Get the full record for a single company with one filtered request. Only full
+# records are cached: a failed or empty lookup raises, so it is never shared with
+# other sessions and is retried on the next run.
+@st.cache_data(ttl=300, max_entries=100)  # Cache details for 5 minutes
+def fetch_company_details(company_name):
+    record = airtable_client.find_by_field("Company Name", company_name, strict=True)
+    if record is None:
+        raise LookupError(company_name)
+    return record
+
+# Get a company's record, falling back to its directory entry if Airtable can't be reached
+def get_company_details(company_name):
+    try:
+        return fetch_company_details(company_name)
+    except LookupError:
+        return None
+    except requests.exceptions.RequestException:
+        return get_mirror(airtable_client, fields=DIRECTORY_FIELDS).find_by_field("Company Name", company_name)
+
+# Record an image reported by the webhook in session state
+def store_generated_image(company_name, image_status):
+    st.session_state.generated_images[company_name] = {
+        "idea_number": image_status.idea_number,
+        "idea_chosen": image_status.idea_chosen,
+        "image_url": image_status.image_url,
+        "file_name": image_status.file_name,
+        "generated_date": image_status.generated_date
     }
+    st.session_state.generated_idea = image_status.display_idea
+
+# Progress shown for each image job state
+JOB_PROGRESS = {
+    image_jobs.QUEUED: 5,
+    image_jobs.RUNNING: 40,
+    image_jobs.WAITING: 80
+}
+
+# Record the outcome of a finished image job in this session
+def finish_image_job(job):
+    if job.state == image_jobs.SUCCEEDED and job.result is not None:
+        store_generated_image(job.company_name, job.result)
+        st.session_state.image_job_notice = ("success", job.message)
+    else:
+        st.session_state.image_job_notice = ("error", job.message)
+    st.session_state.image_job_id = None
+
+# Poll a background image job and show its progress without rerunning the whole page
+@st.fragment(run_every=2)
+def show_image_job(job_id):
+    job = image_jobs.get_job(job_id)
+    if job is None:
+        return
     
-    try:
-        response = requests.post(webhook_url, json=payload)
-        if response.status_code == 200:
-            try:
-                # Handle potentially malformed JSON
-                response_text = response.text
-                
-                # More aggressive JSON cleaning:
-                # 1. Fix missing comma after file_name
-                response_text = response_text.replace('\"file_name\": \"', '\"file_name\": \"').replace('\"\n  \"', '\",\n  \"')
-                
-                # 2. Remove any newlines or control characters within JSON string values
-                import re
-                # First, let's extract the JSON structure
-                matches = re.findall(r'\"([^\"]+)\"\s*:\s*\"([^\"]+)\"', response_text)
-                for key, value in matches:
-                    # Replace any newlines or control chars in the value with empty string
-                    clean_value = re.sub(r'[\n\r\t]', '', value)
-                    # Replace the original value with the cleaned one
-                    response_text = response_text.replace(f'"{key}": "{value}"', f'"{key}": "{clean_value}"')
-                
-                # 3. Ensure proper comma after file_name field
-                response_text = response_text.replace('"file_name": "', '"file_name": "')
-                response_text = response_text.replace('"\n  "generated_date"', '",\n  "generated_date"')
-                
-                # Handle single line responses - another pattern
-                if '"file_name":' in response_text and '"generated_date":' in response_text:
-                    response_text = response_text.replace('"file_name": "', '"file_name": "')
-                    response_text = response_text.replace('png"\n', 'png",\n')
-                    response_text = response_text.replace('png" ', 'png", ')
-                
-                try:
-                    # Try to parse the cleaned JSON
-                    data = json.loads(response_text)
-                except json.JSONDecodeError:
-                    # If still failing, try a more comprehensive approach
-                    # Extract the essential fields and rebuild the JSON
-                    status_match = re.search(r'"status":\s*"([^"]+)"', response_text)
-                    company_match = re.search(r'"company_name":\s*"([^"]+)"', response_text)
-                    idea_match = re.search(r'"idea_number":\s*(\d+)', response_text)
-                    image_match = re.search(r'"image_url":\s*"([^"]+)"', response_text)
-                    file_match = re.search(r'"file_name":\s*"([^"]+)"', response_text)
-                    date_match = re.search(r'"generated_date":\s*"([^"]+)"', response_text)
-                    
-                    # Create a clean JSON object
-                    data = {
-                        "status": status_match.group(1) if status_match else "error",
-                        "company_name": company_match.group(1) if company_match else "",
-                        "idea_number": int(idea_match.group(1)) if idea_match else 0,
-                        "image_url": image_match.group(1) if image_match else "",
-                        "file_name": file_match.group(1) if file_match else "",
-                        "generated_date": date_match.group(1) if date_match else datetime.now().strftime("%Y-%m-%d")
-                    }
-                # Fix image URLs if needed
-                if "image_url" in data and data["image_url"]:
-                    # We're now getting Airtable URLs directly, so just fix ampersand encoding
-                    data["image_url"] = data["image_url"].replace("&amp;", "&")
-                return data
-            except json.JSONDecodeError as e:
-                st.error(f"Error parsing JSON response: {str(e)}")
-                st.code(response.text)  # Display the raw response for debugging
-                return {"status": "error", "message": f"JSON parsing error: {str(e)}"}
-        else:
-            return {"status": "error", "message": f"Error: {response.text}"}
-    except Exception as e:
-        return {"status": "error", "message": f"Exception: {str(e)}"}
+    if not job.done:
+        st.markdown(f"**Generating image for Idea {job.idea_number}...**")
+        st.progress(JOB_PROGRESS.get(job.state, 0))
+        st.markdown(f"{job.message} ({int(job.elapsed)}s elapsed)")
+        return
+    
+    # The job has finished: record the outcome and rerun the full page to show it
+    finish_image_job(job)
+    st.rerun()
+
+# Poll a background PDF build and rerun the page to offer the download once it is ready
+@st.fragment(run_every=1)
+def show_pdf_build(pdf_key):
+    if pdf_generator.get_pdf_build(pdf_key).state == pdf_generator.PDF_BUILDING:
+        st.info("Preparing your PDF...")
+        return
+    st.rerun()
 
 # Header
 st.title("Chamber of Commerce AI Image Ideas")
@@ -157,27 +158,45 @@ creative_ai_concept_illustrations = [
     "https://images.unsplash.com/photo-1497048679117-1a29644559e3"
 ]
 
-# Load data
-companies = get_companies()
-# Get company names and sort them alphabetically
-company_names = [company.get('fields', {}).get('Company Name', 'Unknown') for company in companies if 'Company Name' in company.get('fields', {})]
-company_names.sort()  # Sort alphabetically
+# Load data (records and index come from the same snapshot, so they always agree)
+company_snapshot = get_company_snapshot()
+companies = company_snapshot.records
+company_index = company_snapshot.index
 
 # Sidebar
 with st.sidebar:
     st.header("Navigation")
     
+    # Search-as-you-type company finder narrows the selector to the best matches
+    search_query = st.text_input("Find a company", placeholder="Start typing a company name")
+    if search_query.strip():
+        company_names = company_index.search(search_query, limit=SEARCH_RESULT_LIMIT)
+    else:
+        company_names = company_index.names  # Already sorted alphabetically
+    
+    # Deep links (?company=<name>) preselect a company, even one added since the last mirror sync.
+    # While searching, nothing is preselected, so a company is only opened (and its view
+    # counted) once the user picks one of the matches.
+    default_index = None if search_query.strip() else 0
+    linked_company = st.query_params.get("company")
+    if linked_company and not search_query.strip():
+        linked_position = company_index.position(linked_company)
+        if linked_position is not None:
+            default_index = linked_position
+        elif get_company_details(linked_company):
+            company_names = sorted([*company_names, linked_company])
+            default_index = company_names.index(linked_company)
+    
     # Company selector
     selected_company_name = st.selectbox(
         "Select a company", 
         options=company_names,
-        index=0 if company_names else None
+        index=default_index if company_names else None,
+        placeholder="Choose a matching company" if company_names else "No matching companies"
     )
     
-    # Find the selected company record
-    selected_company = next((company for company in companies 
-                            if company.get('fields', {}).get('Company Name') == selected_company_name), 
-                            None)
+    # Fetch the selected company record
+    selected_company = get_company_details(selected_company_name) if selected_company_name else None
     
     # Check if the company selection has changed
     company_changed = (st.session_state.previous_company != selected_company_name)
@@ -190,29 +209,11 @@ with st.sidebar:
         # Check for existing images for this company
         image_status = check_image_status(selected_company_name)
         
-        # Store the status in session state
-        if image_status.get("status") == "exists":
+        # Store the status in session state; a cached status may be the "success"
+        # of a generation another session just ran, which has an image too
+        if image_status.has_image:
             # Image already exists for this company
-            
-            # Store both idea_number and idea_chosen (if available)
-            idea_number = str(image_status.get("idea_number"))
-            idea_chosen = str(image_status.get("idea_chosen", ""))  # Try to get idea_chosen
-            st.session_state.generated_idea = idea_chosen if idea_chosen else idea_number
-            
-            # Get the image URL and process it if needed
-            image_url = image_status.get("image_url", "")
-            
-            # Just handle ampersand encoding since we're using Airtable URLs directly
-            if image_url:
-                image_url = image_url.replace("&amp;", "&")
-            
-            st.session_state.generated_images[selected_company_name] = {
-                "idea_number": idea_number,
-                "idea_chosen": idea_chosen,  # Store the new field
-                "image_url": image_url,  # Use the processed URL
-                "file_name": image_status.get("file_name", ""),
-                "generated_date": image_status.get("generated_date", datetime.now().strftime("%Y-%m-%d"))
-            }
+            store_generated_image(selected_company_name, image_status)
     
     # Update session state
     st.session_state.selected_company = selected_company
@@ -360,165 +361,6 @@ if st.session_state.selected_company:
         # Parse the AI suggestions
         ai_suggestions = company_data['Open AI Image Suggestions']
         
-        # Create a function to call the webhook
-        def generate_image(idea_number, description):
-            webhook_url = "https://hook.eu2.make.com/z31ifl3yfwdpu23bgbefzy96q5xr5zun"
-            
-            # Prepare the payload
-            payload = {
-                "idea_number": idea_number,
-                "description": description,
-                "company_name": company_data.get('Company Name', 'Unknown')
-            }
-            
-            try:
-                # Call the webhook
-                response = requests.post(webhook_url, json=payload)
-                if response.status_code == 200:
-                    try:
-                        # Handle potentially malformed JSON
-                        response_text = response.text
-                        
-                        # More aggressive JSON cleaning:
-                        # 1. Fix missing comma after file_name
-                        response_text = response_text.replace('\"file_name\": \"', '\"file_name\": \"').replace('\"\n  \"', '\",\n  \"')
-                        
-                        # 2. Remove any newlines or control characters within JSON string values
-                        import re
-                        # First, let's extract the JSON structure
-                        matches = re.findall(r'\"([^\"]+)\"\s*:\s*\"([^\"]+)\"', response_text)
-                        for key, value in matches:
-                            # Replace any newlines or control chars in the value with empty string
-                            clean_value = re.sub(r'[\n\r\t]', '', value)
-                            # Replace the original value with the cleaned one
-                            response_text = response_text.replace(f'"{key}": "{value}"', f'"{key}": "{clean_value}"')
-                        
-                        # 3. Ensure proper comma after file_name field
-                        response_text = response_text.replace('"file_name": "', '"file_name": "')
-                        response_text = response_text.replace('"\n  "generated_date"', '",\n  "generated_date"')
-                        
-                        # Handle single line responses - another pattern
-                        if '"file_name":' in response_text and '"generated_date":' in response_text:
-                            response_text = response_text.replace('"file_name": "', '"file_name": "')
-                            response_text = response_text.replace('png"\n', 'png",\n')
-                            response_text = response_text.replace('png" ', 'png", ')
-                        
-                        try:
-                            # Try to parse the cleaned JSON
-                            data = json.loads(response_text)
-                        except json.JSONDecodeError:
-                            # If still failing, try a more comprehensive approach
-                            # Extract the essential fields and rebuild the JSON
-                            status_match = re.search(r'"status":\s*"([^"]+)"', response_text)
-                            company_match = re.search(r'"company_name":\s*"([^"]+)"', response_text)
-                            idea_match = re.search(r'"idea_number":\s*(\d+)', response_text)
-                            image_match = re.search(r'"image_url":\s*"([^"]+)"', response_text)
-                            file_match = re.search(r'"file_name":\s*"([^"]+)"', response_text)
-                            date_match = re.search(r'"generated_date":\s*"([^"]+)"', response_text)
-                            
-                            # Create a clean JSON object
-                            data = {
-                                "status": status_match.group(1) if status_match else "error",
-                                "company_name": company_match.group(1) if company_match else "",
-                                "idea_number": int(idea_match.group(1)) if idea_match else 0,
-                                "image_url": image_match.group(1) if image_match else "",
-                                "file_name": file_match.group(1) if file_match else "",
-                                "generated_date": date_match.group(1) if date_match else datetime.now().strftime("%Y-%m-%d")
-                            }
-                        
-                        status = data.get("status", "")
-                    except json.JSONDecodeError as e:
-                        st.error(f"Error parsing JSON response: {str(e)}")
-                        st.code(response.text)  # Display the raw response for debugging
-                        return False
-                    
-                    if status == "success":
-                        # Store the image data in session state
-                        company_name = company_data.get('Company Name', 'Unknown')
-                        
-                        # Process the image URL from Airtable
-                        image_url = data.get("image_url", "")
-                        
-                        # Just handle ampersand encoding since we're using Airtable URLs directly
-                        if image_url:
-                            image_url = image_url.replace("&amp;", "&")
-                            
-                        # For successful generation, we use idea_number (since no idea_chosen yet)
-                        # This field will be used to select which idea section shows the image
-                        idea_number = str(data.get("idea_number", ""))
-                        
-                        st.session_state.generated_images[company_name] = {
-                            "idea_number": idea_number,
-                            "idea_chosen": idea_number,  # For new generations, set idea_chosen to be the same as idea_number
-                            "image_url": image_url,  # Use the processed URL
-                            "file_name": data.get("file_name", ""),
-                            "generated_date": data.get("generated_date", datetime.now().strftime("%Y-%m-%d"))
-                        }
-                        
-                        # Show a success message
-                        st.success(f"Successfully generated image for idea {idea_number}.")
-                        
-                        # Store the current idea number in session state for reloading
-                        st.session_state.generated_idea = idea_number
-                        
-                        # Add a small delay to ensure data is properly saved before refresh
-                        time.sleep(0.5)
-                        
-                        # Flag to force refresh after execution completes
-                        st.session_state.force_refresh = True
-                        
-                        return True
-                    elif status == "exists":
-                        # Image already exists
-                        company_name = company_data.get('Company Name', 'Unknown')
-                        
-                        # Process the image URL from Airtable
-                        image_url = data.get("image_url", "")
-                        
-                        # Just handle ampersand encoding since we're using Airtable URLs directly
-                        if image_url:
-                            image_url = image_url.replace("&amp;", "&")
-                            
-                        # Store both idea_number and idea_chosen (if available)
-                        idea_number = str(data.get("idea_number", ""))
-                        idea_chosen = str(data.get("idea_chosen", ""))
-                        
-                        st.session_state.generated_images[company_name] = {
-                            "idea_number": idea_number,
-                            "idea_chosen": idea_chosen,  # Store the new field
-                            "image_url": image_url,  # Use the processed URL
-                            "file_name": data.get("file_name", ""),
-                            "generated_date": data.get("generated_date", datetime.now().strftime("%Y-%m-%d"))
-                        }
-                        # Display message with idea_chosen if available, otherwise use idea_number
-                        display_idea = idea_chosen if idea_chosen else idea_number
-                        st.info(f"Image already exists for idea {display_idea}.")
-                        
-                        # Add a small delay to ensure data is properly saved before refresh
-                        time.sleep(0.5)
-                        
-                        # Flag to force refresh after execution completes
-                        st.session_state.force_refresh = True
-                        
-                        return True
-                    else:
-                        # Status should be "no image and no selection exists"
-                        st.info(f"Generating AI image for idea {idea_number}. Please wait a moment and check back later.")
-                        
-                        # Add a small delay to ensure data is properly saved before refresh
-                        time.sleep(0.5)
-                        
-                        # Flag to force refresh after execution completes
-                        st.session_state.force_refresh = True
-                        
-                        return True
-                else:
-                    st.error(f"Failed to generate image: {response.text}")
-                    return False
-            except Exception as e:
-                st.error(f"Error generating image: {str(e)}")
-                return False
-        
         # Initialize session state for tracking generated ideas
         if 'generated_idea' not in st.session_state:
             st.session_state.generated_idea = None
@@ -573,6 +415,30 @@ if st.session_state.selected_company:
         # Sort ideas by number to ensure 1, 2, 3 order
         valid_ideas.sort(key=lambda x: x['number'])
         
+        # Find an image generation in progress for this company, including one started
+        # by another session or server process
+        company_name = company_data.get('Company Name', 'Unknown')
+        active_job = image_jobs.get_active_job(company_name)
+        
+        # Pick up a watched job that finished while the page wasn't polling it
+        if st.session_state.image_job_id and (active_job is None or active_job.id != st.session_state.image_job_id):
+            finished_job = image_jobs.get_job(st.session_state.image_job_id)
+            if finished_job is None:
+                st.session_state.image_job_id = None
+            elif finished_job.done:
+                finish_image_job(finished_job)
+        if active_job is not None:
+            st.session_state.image_job_id = active_job.id
+        
+        # Show the outcome of a generation that finished since the last run
+        if st.session_state.image_job_notice:
+            notice_type, notice_message = st.session_state.image_job_notice
+            st.session_state.image_job_notice = None
+            if notice_type == "success":
+                st.success(notice_message)
+            else:
+                st.error(notice_message)
+        
         # Display the ideas
         if valid_ideas:
             for i, idea in enumerate(valid_ideas):
@@ -649,55 +515,26 @@ if st.session_state.selected_company:
                         """, 
                         unsafe_allow_html=True
                     )
+                elif active_job is not None:
+                    if active_job.idea_number == idea['number']:
+                        # Live progress of the generation running in the background
+                        show_image_job(active_job.id)
+                    else:
+                        # Grey (disabled) button while another idea is being generated
+                        st.markdown(
+                            f"""
+                            <div style="background-color:#6c757d;padding:10px;border-radius:5px;text-align:center;color:white;">
+                                Image Generation in Progress for Idea {active_job.idea_number}
+                            </div>
+                            """, 
+                            unsafe_allow_html=True
+                        )
                 else:
                     # Regular button if no image has been generated for this company yet
                     if st.button(f"Generate Image for Idea {idea['number']}", key=button_key):
-                        # Store the current idea number in session state for the progress bar
-                        st.session_state.generating_idea = idea['number']
-                        st.session_state.generation_start_time = datetime.now()
-                        
-                        # Create a progress bar to indicate the image is being generated
-                        progress_placeholder = st.empty()
-                        with progress_placeholder.container():
-                            st.markdown(f"**Generating image for Idea {idea['number']}...**")
-                            progress_bar = st.progress(0)
-                            
-                            # Use placeholders for status messages to avoid duplicates
-                            status_placeholder = st.empty()
-                            status_placeholder.markdown("Generating AI image based on description...")
-                            
-                            # Update progress bar to simulate image generation process (takes about 1 minute)
-                            for percent_complete in range(0, 101, 5):
-                                # Slow down the progress bar for a more realistic feel of approximately 1 minute total
-                                if percent_complete < 25:
-                                    time.sleep(0.7)  # First 25% - starting generation
-                                elif percent_complete < 70:
-                                    time.sleep(0.9)  # Next 45% - main image generation
-                                elif percent_complete < 90:
-                                    time.sleep(1.1)  # Next 20% - finalizing and uploading
-                                else:
-                                    time.sleep(1.3)  # Final 10% - finishing up
-                                
-                                progress_bar.progress(percent_complete)
-                                
-                                # Update the status message based on progress (using the placeholder)
-                                if percent_complete == 25:
-                                    status_placeholder.markdown("Processing description and creating image concept...")
-                                elif percent_complete == 50:
-                                    status_placeholder.markdown("Optimizing image details and quality...")
-                                elif percent_complete == 75:
-                                    status_placeholder.markdown("Preparing image for upload to database...")
-                                elif percent_complete == 90:
-                                    status_placeholder.markdown("Almost done - finalizing and saving...")
-                        
-                        # After the progress bar completes, call the generate_image function
-                        success = generate_image(idea['number'], idea.get('description', ''))
-                        if success:
-                            st.session_state.generated_idea = idea['number']
-                            # Clear the progress placeholder
-                            progress_placeholder.empty()
-                            # Force a rerun to update the UI
-                            st.rerun()
+                        # Queue the generation in the background and return immediately
+                        st.session_state.image_job_id = image_jobs.submit(company_name, idea['number'], idea.get('description', ''))
+                        st.rerun()
             
             # Store all valid ideas for PDF/email
             ideas = valid_ideas
@@ -771,25 +608,34 @@ if st.session_state.selected_company:
         if 'Header Image' in company_data and company_data['Header Image']:
             header_image_url = company_data.get('Header Image', [{'url': ''}])[0].get('url', '')
         
-        # Generate PDF with AI suggestions
-        pdf_buffer = generate_pdf(
-            company_name=company_data.get('Company Name', 'Unknown'),
-            images=images,  # Include generated images if available
-            descriptions=idea_descriptions,
-            header_image_url=header_image_url
-        )
-        
-        # Convert to bytes for download button
-        pdf_bytes = pdf_buffer.getvalue()
+        # The PDF is built only when requested, in the background; rendering the page
+        # just looks it up in the shared cache
+        pdf_args = {
+            "company_name": company_data.get('Company Name', 'Unknown'),
+            "images": images,  # Include generated images if available
+            "descriptions": idea_descriptions,
+            "header_image_url": header_image_url
+        }
+        pdf_key = pdf_generator.PdfCache.key(**pdf_args)
+        pdf_build = pdf_generator.get_pdf_build(pdf_key)
         
-        # Provide download button
-        company_name_clean = company_data.get('Company Name', 'Company').replace(' ', '_')
-        st.download_button(
-            "Download Ideas as PDF",
-            data=pdf_bytes,
-            file_name=f"AI_Image_Ideas_{company_name_clean}.pdf",
-            mime="application/pdf"
-        )
+        if pdf_build.state == pdf_generator.PDF_READY:
+            # Provide download button
+            company_name_clean = company_data.get('Company Name', 'Company').replace(' ', '_')
+            st.download_button(
+                "Download Ideas as PDF",
+                data=pdf_build.pdf_bytes,
+                file_name=f"AI_Image_Ideas_{company_name_clean}.pdf",
+                mime="application/pdf"
+            )
+        elif pdf_build.state == pdf_generator.PDF_BUILDING:
+            show_pdf_build(pdf_key)
+        else:
+            if pdf_build.state == pdf_generator.PDF_FAILED:
+                st.error(f"Error preparing PDF: {pdf_build.error}")
+            if st.button("Prepare PDF for Download"):
+                pdf_generator.prepare_pdf(**pdf_args)
+                st.rerun()
     else:
         st.error("No AI image ideas to download.")
     
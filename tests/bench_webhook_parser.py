@@ -0,0 +1,60 @@
+"""
+Benchmark parse_image_status on malformed payloads of growing size
+
+Run from the repository root:
+
+    python tests/bench_webhook_parser.py
+
+For each kind of malformed payload the cost per KB should stay flat as the
+payload grows; a cost per KB that grows with size means parsing went superlinear.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.webhook_parser import parse_image_status  # noqa: E402
+
+SIZES_KB = [1, 4, 16, 64, 256, 1024]
+HEADER = '{\n  "status": "exists",\n  "company_name": "Gamit LTD",\n  "file_name": "Gamit_LTD_idea_1.png"\n'
+
+
+def long_value(size: int) -> str:
+    """A missing comma and a huge message value full of raw newlines"""
+    line = "Image generation log line\n"
+    return HEADER + '  "message": "' + line * (size // len(line)) + '"\n}'
+
+
+def many_fields(size: int) -> str:
+    """Thousands of key/value pairs with no commas between them"""
+    pair = '  "field_%06d": "value"\n'
+    return HEADER + "".join(pair % i for i in range(size // len(pair % 0))) + "}"
+
+
+def unterminated(size: int) -> str:
+    """Escapes and quotes that never close, the worst case for a backtracking scanner"""
+    chunk = '"k\\" :\\"'
+    return HEADER + '  "message": "' + chunk * (size // len(chunk))
+
+
+PAYLOADS = {
+    "long value": long_value,
+    "many fields": many_fields,
+    "unterminated": unterminated,
+}
+
+
+def main() -> None:
+    print(f"{'payload':<14}{'size KB':>9}{'ms':>10}{'us/KB':>9}")
+    for kind, make in PAYLOADS.items():
+        for size_kb in SIZES_KB:
+            text = make(size_kb * 1024)
+            assert parse_image_status(text).status == "exists"
+            runs = max(1, 256 // size_kb)
+            seconds = min(timeit.repeat(lambda: parse_image_status(text), number=runs, repeat=5)) / runs
+            print(f"{kind:<14}{size_kb:>9}{seconds * 1000:>10.2f}{seconds * 1e6 / size_kb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import json
+import time
+
+import pytest
+import requests
+
+from utils import airtable_client, http_client
+from utils.airtable_client import AirtableClient
+
+API = "https://api.airtable.com/v0"
+
+
+class FakeAirtable:
+    """Stands in for http_client.request, answering from a table of IDs and records"""
+
+    def __init__(self, base_id: str = "appNEW", table_id: str = "tblNEW", record_count: int = 3):
+        self.base_id = base_id
+        self.table_id = table_id
+        self.records = [{"id": f"rec{i}", "fields": {"Company Name": f"Company {i}"}} for i in range(record_count)]
+        self.down = False
+        # Statuses to answer list requests with, by offset, instead of a page
+        self.page_failures = {}
+        self.calls = []
+
+    def request(self, method, url, headers=None, params=None, json=None, **kwargs):
+        self.calls.append((method, url))
+        if self.down:
+            raise requests.exceptions.ConnectionError("Airtable is down")
+        if url == f"{API}/meta/bases":
+            return self._response(200, {"bases": [{"id": self.base_id, "name": "Base"}]})
+        if url == f"{API}/meta/bases/{self.base_id}/tables":
+            return self._response(200, {"tables": [{"id": self.table_id, "name": "Companies"}]})
+
+        table_url = f"{API}/{self.base_id}/{self.table_id}"
+        if url == table_url:
+            offset = int((params or {}).get("offset", 0))
+            if offset in self.page_failures:
+                return self._response(self.page_failures[offset], {"error": "failed"})
+            page_size = (params or {}).get("pageSize", 100)
+            page = {"records": self.records[offset:offset + page_size]}
+            if offset + page_size < len(self.records):
+                page["offset"] = str(offset + page_size)
+            return self._response(200, page)
+        if url.startswith(table_url + "/"):
+            record_id = url.rsplit("/", 1)[1]
+            record = next((record for record in self.records if record["id"] == record_id), None)
+            return self._response(200, record) if record else self._response(404, {"error": "NOT_FOUND"})
+        return self._response(404, {"error": {"type": "TABLE_NOT_FOUND"}})
+
+    @staticmethod
+    def _response(status: int, body) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode()
+        return response
+
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    monkeypatch.setattr(airtable_client, "METADATA_CACHE_FILE", str(tmp_path / "metadata.json"))
+    fake = FakeAirtable()
+    monkeypatch.setattr(http_client, "request", fake.request)
+    return fake
+
+
+def cache_ids(base_id: str, table_id: str, age: float = 0) -> None:
+    airtable_client._save_metadata_cache({
+        "Base/Companies": {"base_id": base_id, "table_id": table_id, "resolved_at": time.time() - age}
+    })
+
+
+def test_ids_are_resolved_and_cached(fake):
+    client = AirtableClient("pat", "Base", "Companies")
+
+    assert (client.base_id, client.table_id) == ("appNEW", "tblNEW")
+    assert airtable_client._load_metadata_cache()["Base/Companies"]["table_id"] == "tblNEW"
+
+
+def test_stale_cached_ids_are_refreshed_on_404(fake):
+    cache_ids("appOLD", "tblOLD")
+    client = AirtableClient("pat", "Base", "Companies")
+    assert client.table_id == "tblOLD"
+
+    assert client.get_record("rec1")["id"] == "rec1"
+    assert (client.base_id, client.table_id) == ("appNEW", "tblNEW")
+    assert airtable_client._load_metadata_cache()["Base/Companies"]["table_id"] == "tblNEW"
+
+
+def test_missing_record_only_refreshes_cached_ids_once(fake):
+    cache_ids("appNEW", "tblNEW")
+    client = AirtableClient("pat", "Base", "Companies")
+
+    assert client.get_record("recMISSING") is None
+    assert client.get_record("recMISSING") is None
+    assert sum(url == f"{API}/meta/bases" for _, url in fake.calls) == 1
+
+
+def test_expired_ids_are_used_while_airtable_is_down(fake):
+    cache_ids("appNEW", "tblNEW", age=airtable_client.METADATA_CACHE_TTL + 60)
+    fake.down = True
+
+    client = AirtableClient("pat", "Base", "Companies")
+
+    assert (client.base_id, client.table_id) == ("appNEW", "tblNEW")
+
+
+def test_startup_fails_without_any_cached_ids_while_airtable_is_down(fake):
+    fake.down = True
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        AirtableClient("pat", "Base", "Companies")
+
+
+def test_get_all_records_follows_pagination(fake):
+    fake.records = FakeAirtable(record_count=250).records
+    client = AirtableClient("pat", "Base", "Companies")
+
+    assert [record["id"] for record in client.get_all_records()] == [f"rec{i}" for i in range(250)]
+
+
+def test_get_all_records_raises_when_a_later_page_fails(fake):
+    fake.records = FakeAirtable(record_count=250).records
+    fake.page_failures[100] = 503
+    client = AirtableClient("pat", "Base", "Companies")
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_all_records()
+
+
+def test_iter_records_raises_when_a_later_page_fails(fake):
+    fake.records = FakeAirtable(record_count=250).records
+    fake.page_failures[100] = 503
+    client = AirtableClient("pat", "Base", "Companies")
+    records = client.iter_records()
+
+    assert len([next(records) for _ in range(100)]) == 100
+    with pytest.raises(requests.exceptions.HTTPError):
+        next(records)
@@ -0,0 +1,183 @@
+import asyncio
+from collections import Counter
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils import airtable_client, http_client
+from utils.async_airtable_client import AsyncAirtableClient
+
+BASE_ID = "appTEST"
+TABLE_ID = "tblTEST"
+
+
+class StandInAirtable:
+    """Local stand-in for the parts of the Airtable API the client uses"""
+
+    def __init__(self, record_count: int = 0):
+        self.records = {
+            f"rec{i:04d}": {"id": f"rec{i:04d}", "fields": {"Name": f"Company {i}"}}
+            for i in range(record_count)
+        }
+        # Requests seen, by path
+        self.hits = Counter()
+        # Query strings of list requests, in order
+        self.list_queries = []
+        # Statuses to answer with before serving requests normally, by path
+        self.failures = {}
+
+    def make_app(self) -> web.Application:
+        """Build the web app; an app is bound to one event loop, so each run gets a new one"""
+        app = web.Application(middlewares=[self._record_hit])
+        app.router.add_get("/v0/meta/bases", self.bases)
+        app.router.add_get(f"/v0/meta/bases/{BASE_ID}/tables", self.tables)
+        app.router.add_get(f"/v0/{BASE_ID}/{TABLE_ID}", self.list_records)
+        app.router.add_get(f"/v0/{BASE_ID}/{TABLE_ID}/{{record_id}}", self.get_record)
+        app.router.add_patch(f"/v0/{BASE_ID}/{TABLE_ID}/{{record_id}}", self.update_record)
+        return app
+
+    @web.middleware
+    async def _record_hit(self, request, handler):
+        key = request.path_qs if request.query.get("offset") else request.path
+        self.hits[key] += 1
+        pending = self.failures.get(key)
+        if pending:
+            status = pending.pop(0)
+            return web.json_response({"error": status}, status=status, headers={"Retry-After": "0"})
+        return await handler(request)
+
+    async def bases(self, request):
+        return web.json_response({"bases": [{"id": BASE_ID, "name": "Base"}]})
+
+    async def tables(self, request):
+        return web.json_response({"tables": [{"id": TABLE_ID, "name": "Companies"}]})
+
+    async def list_records(self, request):
+        self.list_queries.append(request.query)
+        page_size = int(request.query.get("pageSize", 100))
+        start = int(request.query.get("offset", 0))
+        ids = sorted(self.records)[start:start + page_size]
+        page = {"records": [self.records[record_id] for record_id in ids]}
+        if start + page_size < len(self.records):
+            page["offset"] = str(start + page_size)
+        return web.json_response(page)
+
+    async def get_record(self, request):
+        record = self.records.get(request.match_info["record_id"])
+        if record is None:
+            return web.json_response({"error": "NOT_FOUND"}, status=404)
+        # Let concurrent requests overlap
+        await asyncio.sleep(0.01)
+        return web.json_response(record)
+
+    async def update_record(self, request):
+        record = self.records.get(request.match_info["record_id"])
+        if record is None:
+            return web.json_response({"error": "NOT_FOUND"}, status=404)
+        record["fields"].update((await request.json())["fields"])
+        return web.json_response(record)
+
+
+@pytest.fixture(autouse=True)
+def isolated_transport(tmp_path, monkeypatch):
+    """Give each test its own metadata cache, rate limit buckets and fast retries"""
+    monkeypatch.setattr(airtable_client, "METADATA_CACHE_FILE", str(tmp_path / "metadata.json"))
+    monkeypatch.setattr(http_client, "_buckets", {})
+    monkeypatch.setitem(http_client.RATE_LIMITS, "api.airtable.com", 1000.0)
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+
+
+def run_against(server: StandInAirtable, scenario):
+    """Run `scenario(client)` against the stand-in server and return its result"""
+    async def main():
+        async with TestServer(server.make_app()) as test_server:
+            api_url = str(test_server.make_url("")).rstrip("/")
+            async with AsyncAirtableClient("pat", "Base", "Companies", api_url=api_url) as client:
+                return await scenario(client)
+
+    return asyncio.run(main())
+
+
+def test_get_all_records_follows_pagination():
+    server = StandInAirtable(record_count=250)
+
+    records = run_against(server, lambda client: client.get_all_records())
+
+    assert [record["id"] for record in records] == sorted(server.records)
+    assert server.hits[f"/v0/{BASE_ID}/{TABLE_ID}"] == 1
+    assert server.hits[f"/v0/{BASE_ID}/{TABLE_ID}?pageSize=100&offset=100"] == 1
+    assert server.hits[f"/v0/{BASE_ID}/{TABLE_ID}?pageSize=100&offset=200"] == 1
+
+
+def test_iter_records_passes_filter_and_fields():
+    server = StandInAirtable(record_count=3)
+
+    async def scenario(client):
+        return [record async for record in client.iter_records(
+            page_size=2, filter_by_formula="{Name} != ''", fields=["Name", "City"]
+        )]
+
+    records = run_against(server, scenario)
+
+    assert len(records) == 3
+    assert server.list_queries[0]["pageSize"] == "2"
+    assert server.list_queries[0]["filterByFormula"] == "{Name} != ''"
+    assert server.list_queries[0].getall("fields[]") == ["Name", "City"]
+
+
+def test_get_all_records_raises_when_a_later_page_fails():
+    server = StandInAirtable(record_count=250)
+    server.failures[f"/v0/{BASE_ID}/{TABLE_ID}?pageSize=100&offset=100"] = [503] * (http_client.MAX_RETRIES + 1)
+
+    with pytest.raises(aiohttp.ClientResponseError) as excinfo:
+        run_against(server, lambda client: client.get_all_records())
+    assert excinfo.value.status == 503
+
+
+def test_concurrent_get_record_resolves_ids_once():
+    server = StandInAirtable(record_count=50)
+    record_ids = sorted(server.records)
+
+    async def scenario(client):
+        return await asyncio.gather(*(client.get_record(record_id) for record_id in record_ids))
+
+    records = run_against(server, scenario)
+
+    assert [record["id"] for record in records] == record_ids
+    assert server.hits["/v0/meta/bases"] == 1
+    assert server.hits[f"/v0/meta/bases/{BASE_ID}/tables"] == 1
+
+
+def test_get_record_returns_none_when_missing():
+    server = StandInAirtable(record_count=1)
+
+    assert run_against(server, lambda client: client.get_record("recMISSING")) is None
+
+
+def test_update_record():
+    server = StandInAirtable(record_count=2)
+
+    assert run_against(server, lambda client: client.update_record("rec0001", {"Image": "done"})) is True
+    assert server.records["rec0001"]["fields"] == {"Name": "Company 1", "Image": "done"}
+    assert run_against(server, lambda client: client.update_record("recMISSING", {"Image": "done"})) is False
+
+
+def test_retries_after_429():
+    server = StandInAirtable(record_count=1)
+    server.failures[f"/v0/{BASE_ID}/{TABLE_ID}/rec0000"] = [429, 429]
+
+    record = run_against(server, lambda client: client.get_record("rec0000"))
+
+    assert record["id"] == "rec0000"
+    assert server.hits[f"/v0/{BASE_ID}/{TABLE_ID}/rec0000"] == 3
+
+
+def test_ids_come_from_the_metadata_cache():
+    server = StandInAirtable(record_count=1)
+    run_against(server, lambda client: client.get_record("rec0000"))
+
+    run_against(server, lambda client: client.get_record("rec0000"))
+
+    assert server.hits["/v0/meta/bases"] == 1
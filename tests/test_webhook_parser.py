@@ -0,0 +1,114 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from utils.webhook_parser import parse_image_status
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(__file__), "data", "webhook_payloads")
+IMAGE_URL = "https://dl.airtable.com/img.png"
+TODAY = object()
+
+# Fields each corpus payload must parse to; fields not listed must be empty.
+# TODAY marks a generated_date the payload lacks, which defaults to today.
+EXPECTED = {
+    "well_formed.json": {
+        "status": "exists", "company_name": "Gamit LTD", "idea_number": "1", "idea_chosen": "1",
+        "image_url": IMAGE_URL, "file_name": "Gamit_LTD_idea_1.png", "generated_date": "2025-04-29",
+    },
+    "missing_comma_after_file_name.txt": {
+        "status": "exists", "company_name": "Gamit LTD", "idea_number": "2",
+        "image_url": IMAGE_URL, "file_name": "Gamit_LTD_idea_2.png", "generated_date": "2025-04-29",
+    },
+    "missing_comma_single_line.txt": {
+        "status": "success", "company_name": "Gamit LTD", "idea_number": "3",
+        "image_url": IMAGE_URL, "file_name": "Gamit_LTD_idea_3.png", "generated_date": "2025-04-30",
+    },
+    "newline_in_url.txt": {
+        "status": "exists", "company_name": "Gamit LTD", "idea_number": "1",
+        "image_url": IMAGE_URL, "file_name": "Gamit_LTD_idea_1.png", "generated_date": "2025-04-29",
+    },
+    "crlf_and_tab_in_values.txt": {
+        "status": "exists", "company_name": "GamitLTD", "idea_number": "1",
+        "image_url": IMAGE_URL, "file_name": "Gamit_LTD_idea_1.png", "generated_date": "2025-04-29",
+    },
+    "amp_encoded_url.txt": {
+        "status": "exists", "company_name": "Gamit LTD", "idea_number": "1",
+        "image_url": "https://v5.airtableusercontent.com/v3/u/40/40/1745971200000/AbC_dEf/img.png"
+                     "?expires=1745978400&sig=Xy12",
+        "file_name": "Gamit_LTD_idea_1.png", "generated_date": "2025-04-29",
+    },
+    "escaped_quotes_in_message.txt": {
+        "status": "error", "company_name": "Gamit LTD", "message": 'Image for "Gamit LTD" failed:timeout',
+        "generated_date": "2025-04-29",
+    },
+    "no_image_numeric_idea.txt": {
+        "status": "no_image", "company_name": "Gamit LTD", "idea_number": "0", "generated_date": TODAY,
+    },
+    "trailing_comma.txt": {
+        "status": "exists", "company_name": "Gamit LTD", "idea_number": "1",
+        "image_url": IMAGE_URL, "file_name": "Gamit_LTD_idea_1.png", "generated_date": "2025-04-29",
+    },
+    "duplicate_keys.txt": {
+        "status": "success", "company_name": "Gamit LTD", "image_url": "https://dl.airtable.com/first.png",
+        "file_name": "Gamit_LTD_idea_1.png", "generated_date": TODAY,
+    },
+    "truncated.txt": {
+        "status": "success", "company_name": "Gamit LTD", "idea_number": "1", "generated_date": TODAY,
+    },
+    "json_array.txt": {
+        "status": "exists", "company_name": "Gamit LTD", "image_url": IMAGE_URL, "generated_date": TODAY,
+    },
+    "accepted.txt": {
+        "status": "error", "message": "Unrecognised webhook response: Accepted",
+    },
+    "html_error.txt": {
+        "status": "error",
+        "message": "Unrecognised webhook response: <!DOCTYPE html>\n<html><head><title>502 Bad Gateway</title>"
+                   "</head>\n<body><h1>Bad Gateway</h1></body></html>\n",
+    },
+}
+
+
+def read_payload(name: str) -> str:
+    # Keep \r\n line endings as the webhook sent them
+    with open(os.path.join(PAYLOAD_DIR, name), newline="") as f:
+        return f.read()
+
+
+def test_every_payload_has_expectations():
+    assert sorted(os.listdir(PAYLOAD_DIR)) == sorted(EXPECTED)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_parse_payload(name):
+    expected = {field: "" for field in (
+        "status", "company_name", "idea_number", "idea_chosen", "image_url", "file_name",
+        "generated_date", "message",
+    )}
+    expected.update(EXPECTED[name])
+    if expected["generated_date"] is TODAY:
+        expected["generated_date"] = datetime.now().strftime("%Y-%m-%d")
+
+    assert parse_image_status(read_payload(name)).to_dict() == expected
+
+
+@pytest.mark.parametrize("name, has_image", [
+    ("well_formed.json", True),
+    ("missing_comma_single_line.txt", True),
+    ("no_image_numeric_idea.txt", False),
+    ("escaped_quotes_in_message.txt", False),
+    ("html_error.txt", False),
+])
+def test_has_image(name, has_image):
+    assert parse_image_status(read_payload(name)).has_image is has_image
+
+
+@pytest.mark.parametrize("name, unrecognised", [
+    ("accepted.txt", True),
+    ("html_error.txt", True),
+    ("escaped_quotes_in_message.txt", False),
+    ("well_formed.json", False),
+])
+def test_unrecognised(name, unrecognised):
+    assert parse_image_status(read_payload(name)).unrecognised is unrecognised
@@ -1,7 +1,90 @@
 import os
+import json
+import time
+import tempfile
+import threading
 import requests
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+from utils import http_client
+
+# Airtable caps pageSize at 100 records per request
+MAX_PAGE_SIZE = 100
+# Airtable accepts at most 10 records per batch write
+MAX_BATCH_SIZE = 10
+
+# File used to share resolved base/table IDs across processes
+METADATA_CACHE_FILE = os.getenv("AIRTABLE_METADATA_CACHE", ".airtable_metadata_cache.json")
+# How long resolved IDs stay valid before the metadata API is queried again
+METADATA_CACHE_TTL = 24 * 60 * 60
+
+# Process-wide client instances keyed by (pat, base_name, table_name)
+_clients: Dict[Tuple[str, str, str], "AirtableClient"] = {}
+_clients_lock = threading.Lock()
+
+
+def _load_metadata_cache() -> Dict[str, Any]:
+    """Load the on-disk metadata cache, returning an empty cache if missing or corrupt"""
+    if not os.path.exists(METADATA_CACHE_FILE):
+        return {}
+    
+    try:
+        with open(METADATA_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_metadata_cache(cache: Dict[str, Any]) -> None:
+    """Atomically write the metadata cache so concurrent readers never see a partial file"""
+    cache_dir = os.path.dirname(os.path.abspath(METADATA_CACHE_FILE))
+    try:
+        with tempfile.NamedTemporaryFile("w", dir=cache_dir, delete=False, suffix=".tmp") as f:
+            json.dump(cache, f)
+            temp_path = f.name
+        os.replace(temp_path, METADATA_CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"Could not write Airtable metadata cache: {str(e)}")
+
+
+def formula_literal(value: Any) -> str:
+    """
+    Render a Python value as a literal in an Airtable formula
+    
+    Args:
+        value: String, number or boolean to render
+        
+    Returns:
+        Formula literal, with strings quoted and escaped
+    """
+    if isinstance(value, bool):
+        return "TRUE()" if value else "FALSE()"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    escaped = str(value).replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def get_client(pat: str, base_name: str, table_name: str) -> "AirtableClient":
+    """
+    Get the process-wide Airtable client for a base and table, creating it on first use
+    
+    Args:
+        pat: Personal Access Token for Airtable
+        base_name: Name of the Airtable base
+        table_name: Name of the table within the base
+        
+    Returns:
+        Shared AirtableClient instance
+    """
+    key = (pat, base_name, table_name)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = AirtableClient(pat=pat, base_name=base_name, table_name=table_name)
+            _clients[key] = client
+        return client
 
 class AirtableClient:
     """Client for interacting with Airtable API"""
@@ -20,6 +103,10 @@ class AirtableClient:
         self.table_name = table_name
         self.base_id = None
         self.table_id = None
+        # Optional local index (e.g. an AirtableMirror) used when Airtable can't be reached
+        self.local_index = None
+        # Whether the IDs came from the metadata cache and may be out of date
+        self._ids_from_cache = False
         self.headers = {
             "Authorization": f"Bearer {self.pat}",
             "Content-Type": "application/json"
@@ -28,12 +115,58 @@ class AirtableClient:
         # Initialize the client
         self._get_base_and_table_ids()
     
-    def _get_base_and_table_ids(self) -> None:
-        """Get the base ID and table ID from base name and table name"""
+    @property
+    def _metadata_cache_key(self) -> str:
+        return f"{self.base_name}/{self.table_name}"
+    
+    def _load_cached_ids(self, max_age: Optional[float] = METADATA_CACHE_TTL) -> bool:
+        """
+        Load base and table IDs from the metadata cache if a fresh entry exists
+        
+        Args:
+            max_age: Oldest entry, in seconds, that may be used; None accepts any age
+        
+        Returns:
+            True if IDs were loaded from the cache, False otherwise
+        """
+        entry = _load_metadata_cache().get(self._metadata_cache_key)
+        if not entry or (max_age is not None and time.time() - entry.get("resolved_at", 0) > max_age):
+            return False
+        
+        self.base_id = entry.get("base_id")
+        self.table_id = entry.get("table_id")
+        return bool(self.base_id and self.table_id)
+    
+    def _store_cached_ids(self) -> None:
+        """Record the resolved base and table IDs in the metadata cache"""
+        cache = _load_metadata_cache()
+        cache[self._metadata_cache_key] = {
+            "base_id": self.base_id,
+            "table_id": self.table_id,
+            "resolved_at": time.time()
+        }
+        _save_metadata_cache(cache)
+    
+    def _get_base_and_table_ids(self, use_cache: bool = True) -> None:
+        """
+        Get the base ID and table ID from base name and table name
+        
+        If the metadata API can't be reached, an expired cache entry is used rather
+        than failing, so the app keeps working from the last known IDs.
+        
+        Args:
+            use_cache: Whether a fresh entry in the metadata cache may be used
+                instead of querying the metadata API
+        """
+        if use_cache and self._load_cached_ids():
+            self._ids_from_cache = True
+            return
+        
+        previous_ids = (self.base_id, self.table_id)
         try:
             # Get list of bases
             bases_url = "https://api.airtable.com/v0/meta/bases"
-            response = requests.get(bases_url, headers=self.headers)
+            response = http_client.get(bases_url, headers=self.headers)
             response.raise_for_status()
             
             # Find the base with the matching name
@@ -47,7 +180,7 @@ class AirtableClient:
             
             # Get list of tables in the base
             tables_url = f"https://api.airtable.com/v0/meta/bases/{self.base_id}/tables"
-            response = requests.get(tables_url, headers=self.headers)
+            response = http_client.get(tables_url, headers=self.headers)
             response.raise_for_status()
             
             # Find the table with the matching name
@@ -58,31 +191,150 @@ class AirtableClient:
                 raise ValueError(f"Table '{self.table_name}' not found in base '{self.base_name}'")
             
             self.table_id = matching_table.get("id")
+            self._ids_from_cache = False
+            self._store_cached_ids()
             
+        except ValueError:
+            self.base_id, self.table_id = previous_ids
+            raise
         except requests.exceptions.RequestException as e:
             logging.error(f"Error connecting to Airtable: {str(e)}")
+            self.base_id, self.table_id = previous_ids
+            if self._load_cached_ids(max_age=None):
+                logging.warning("Using expired Airtable metadata cache entry until Airtable can be reached")
+                self._ids_from_cache = True
+                return
             raise
     
-    def get_all_records(self) -> List[Dict[str, Any]]:
+    def _request(self, method: str, path: str = "", **kwargs) -> requests.Response:
         """
-        Get all records from the Airtable table
+        Send a request to the table, re-resolving its IDs once if cached ones turn out stale
+        
+        A base or table recreated under the same name gets new IDs, so a 404 for IDs
+        taken from the metadata cache triggers one lookup through the metadata API.
+        
+        Args:
+            method: HTTP method
+            path: Path below the table URL, e.g. "/<record id>"
+            **kwargs: Additional arguments passed to http_client.request
         
         Returns:
-            List of records from the table
+            Successful response
+        
+        Raises:
+            requests.exceptions.RequestException: If the request fails
         """
-        try:
-            if not self.base_id or not self.table_id:
-                self._get_base_and_table_ids()
+        if not self.base_id or not self.table_id:
+            self._get_base_and_table_ids()
+        
+        response = http_client.request(method, self._table_url(path), headers=self.headers, **kwargs)
+        if response.status_code == 404 and self._ids_from_cache:
+            stale_ids = (self.base_id, self.table_id)
+            try:
+                self._get_base_and_table_ids(use_cache=False)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logging.warning(f"Could not refresh Airtable IDs after a 404: {str(e)}")
+            else:
+                if (self.base_id, self.table_id) != stale_ids:
+                    response = http_client.request(method, self._table_url(path), headers=self.headers, **kwargs)
+        
+        response.raise_for_status()
+        return response
+    
+    def _table_url(self, path: str = "") -> str:
+        return f"https://api.airtable.com/v0/{self.base_id}/{self.table_id}{path}"
+    
+    def iter_records(self, page_size: int = MAX_PAGE_SIZE, filter_by_formula: Optional[str] = None,
+                     fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream records from the Airtable table, following the offset cursor page by page
+        
+        A failed page raises rather than ending the stream, so callers never mistake
+        a partial table for the whole one.
+        
+        Args:
+            page_size: Number of records requested per page (1-100)
+            filter_by_formula: Airtable formula records must satisfy (optional)
+            fields: Names of the fields to return; all fields are returned if omitted
             
-            records_url = f"https://api.airtable.com/v0/{self.base_id}/{self.table_id}"
-            response = requests.get(records_url, headers=self.headers)
-            response.raise_for_status()
+        Yields:
+            Records from the table, one at a time
             
-            return response.json().get("records", [])
+        Raises:
+            requests.exceptions.RequestException: If a page could not be fetched
+        """
+        try:
+            params = {"pageSize": max(1, min(page_size, MAX_PAGE_SIZE))}
+            if filter_by_formula:
+                params["filterByFormula"] = filter_by_formula
+            if fields:
+                params["fields[]"] = list(fields)
             
+            while True:
+                page = self._request("GET", params=params).json()
+                
+                yield from page.get("records", [])
+                
+                # Airtable only returns an offset while more pages remain
+                offset = page.get("offset")
+                if not offset:
+                    return
+                params["offset"] = offset
+                
         except requests.exceptions.RequestException as e:
             logging.error(f"Error fetching records from Airtable: {str(e)}")
-            return []
+            raise
+    
+    def get_all_records(self, page_size: int = MAX_PAGE_SIZE, filter_by_formula: Optional[str] = None,
+                        fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Get all records from the Airtable table
+        
+        If any page fails, the error is raised instead of returning the records
+        fetched so far, so a partial list is never mistaken for the whole table.
+        
+        Args:
+            page_size: Number of records requested per page (1-100)
+            filter_by_formula: Airtable formula records must satisfy (optional)
+            fields: Names of the fields to return; all fields are returned if omitted
+        
+        Returns:
+            List of records from the table
+            
+        Raises:
+            requests.exceptions.RequestException: If any page could not be fetched
+        """
+        return list(self.iter_records(page_size=page_size, filter_by_formula=filter_by_formula, fields=fields))
+    
+    def find_by_field(self, field: str, value: Any, strict: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Find the first record whose field equals a value, filtered server-side
+        
+        If Airtable can't be reached, the lookup falls back to the attached local
+        index (see `local_index`), which may hold fewer fields.
+        
+        Args:
+            field: Name of the field to match
+            value: Value the field must equal
+            strict: Re-raise request errors instead of falling back to the local index,
+                so callers can tell a partial record from a full one
+            
+        Returns:
+            Matching record or None if not found
+        """
+        formula = f"{{{field}}} = {formula_literal(value)}"
+        try:
+            params = {"filterByFormula": formula, "maxRecords": 1}
+            records = self._request("GET", params=params).json().get("records", [])
+            return records[0] if records else None
+            
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error finding record in Airtable: {str(e)}")
+            if strict:
+                raise
+            if self.local_index is not None:
+                return self.local_index.find_by_field(field, value)
+            return None
     
     def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -95,14 +347,7 @@ class AirtableClient:
             Record data or None if not found
         """
         try:
-            if not self.base_id or not self.table_id:
-                self._get_base_and_table_ids()
-            
-            record_url = f"https://api.airtable.com/v0/{self.base_id}/{self.table_id}/{record_id}"
-            response = requests.get(record_url, headers=self.headers)
-            response.raise_for_status()
-            
-            return response.json()
+            return self._request("GET", f"/{record_id}").json()
             
         except requests.exceptions.RequestException as e:
             logging.error(f"Error fetching record from Airtable: {str(e)}")
@@ -120,17 +365,108 @@ class AirtableClient:
             True if update was successful, False otherwise
         """
         try:
-            if not self.base_id or not self.table_id:
-                self._get_base_and_table_ids()
-            
-            record_url = f"https://api.airtable.com/v0/{self.base_id}/{self.table_id}/{record_id}"
-            data = {"fields": fields}
-            
-            response = requests.patch(record_url, headers=self.headers, json=data)
-            response.raise_for_status()
-            
+            self._request("PATCH", f"/{record_id}", json={"fields": fields})
             return True
             
         except requests.exceptions.RequestException as e:
             logging.error(f"Error updating record in Airtable: {str(e)}")
             return False
+    
+    def update_records(self, records: List[Dict[str, Any]]) -> List[str]:
+        """
+        Update many records, sending up to 10 per PATCH request
+        
+        Args:
+            records: Records to update, each a dict with "id" and "fields" keys
+            
+        Returns:
+            IDs of the records that could not be updated (empty if all succeeded)
+        """
+        failed = []
+        try:
+            if not self.base_id or not self.table_id:
+                self._get_base_and_table_ids()
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error updating records in Airtable: {str(e)}")
+            return [record["id"] for record in records]
+        
+        for start in range(0, len(records), MAX_BATCH_SIZE):
+            chunk = records[start:start + MAX_BATCH_SIZE]
+            data = {"records": [{"id": record["id"], "fields": record["fields"]} for record in chunk]}
+            try:
+                self._request("PATCH", json=data)
+            except requests.exceptions.RequestException as e:
+                logging.error(f"Error updating records in Airtable: {str(e)}")
+                failed.extend(record["id"] for record in chunk)
+        
+        return failed
+    
+    def write_queue(self) -> "WriteQueue":
+        """
+        Create a write queue that coalesces updates to this client's table
+        
+        Returns:
+            New WriteQueue; use it as a context manager to flush on exit
+        """
+        return WriteQueue(self)
+
+
+class WriteQueue:
+    """Buffer of pending record updates that merges repeated writes and flushes in batches"""
+    
+    def __init__(self, client: AirtableClient):
+        """
+        Initialize the write queue
+        
+        Args:
+            client: Airtable client whose table the updates are written to
+        """
+        self.client = client
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+    
+    def __enter__(self) -> "WriteQueue":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.flush()
+    
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.pending)
+    
+    def update(self, record_id: str, fields: Dict[str, Any]) -> None:
+        """
+        Queue an update, merging it into any pending update for the same record
+        
+        Args:
+            record_id: ID of the record to update
+            fields: Dictionary of field names and values to update; later values win
+        """
+        with self.lock:
+            self.pending.setdefault(record_id, {}).update(fields)
+    
+    def flush(self) -> bool:
+        """
+        Write all pending updates in 10-record batches (rate limited by the HTTP transport)
+        
+        Updates that fail are put back in the queue, beneath any newer writes queued
+        for the same record in the meantime, so a later flush can retry them.
+        
+        Returns:
+            True if every pending update was written, False otherwise
+        """
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        
+        if not batch:
+            return True
+        
+        failed = self.client.update_records([{"id": record_id, "fields": fields} for record_id, fields in batch.items()])
+        
+        if failed:
+            with self.lock:
+                for record_id in failed:
+                    self.pending[record_id] = {**batch[record_id], **self.pending.get(record_id, {})}
+        
+        return not failed
@@ -0,0 +1,277 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+
+import requests
+
+from utils.airtable_client import AirtableClient
+
+# SQLite file holding the local copy of the Airtable table
+MIRROR_DB_FILE = os.getenv("AIRTABLE_MIRROR_DB", "airtable_mirror.db")
+# Seconds between background delta syncs
+SYNC_INTERVAL = 300
+# Seconds between full syncs, which also drop records deleted in Airtable
+FULL_SYNC_INTERVAL = 24 * 60 * 60
+# Fields with an SQLite expression index, for fast local lookups by value
+INDEXED_FIELDS = ["Company Name"]
+# Overlap applied to the delta watermark to tolerate clock skew with Airtable
+WATERMARK_SKEW = timedelta(minutes=2)
+
+# Process-wide mirrors keyed by database path
+_mirrors: Dict[str, "AirtableMirror"] = {}
+_mirrors_lock = threading.Lock()
+
+
+class AirtableMirror:
+    """Local SQLite mirror of an Airtable table, kept current with incremental delta syncs"""
+
+    def __init__(self, client: AirtableClient, db_path: str = MIRROR_DB_FILE,
+                 fields: Optional[List[str]] = None):
+        """
+        Initialize the mirror
+
+        Args:
+            client: Airtable client for the table being mirrored
+            db_path: Path of the SQLite database file
+            fields: Names of the fields to mirror; all fields are mirrored if omitted
+        """
+        self.client = client
+        self.db_path = db_path
+        self.fields = fields
+        self._sync_lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; WAL mode lets readers in other processes proceed during a sync"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _create_schema(self) -> None:
+        """Create the mirror tables if they do not exist yet"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS records (
+                    id TEXT PRIMARY KEY,
+                    created_time TEXT,
+                    fields TEXT NOT NULL
+                )
+            """)
+            for field in INDEXED_FIELDS:
+                index_name = "idx_field_" + re.sub(r"\W", "_", field).lower()
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON records ({self._field_expr(field)})")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+
+    @staticmethod
+    def _field_expr(field: str) -> str:
+        """
+        SQL expression extracting a field from the stored JSON
+
+        The path is inlined rather than bound so queries match the expression indexes.
+        """
+        path = '$."' + field.replace('"', '\\"') + '"'
+        return "json_extract(fields, '" + path.replace("'", "''") + "')"
+
+    def _get_state(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def is_empty(self) -> bool:
+        """Whether the mirror has never completed a sync"""
+        with self._connect() as conn:
+            return self._get_state(conn, "last_sync") is None
+
+    @property
+    def _projection(self) -> str:
+        """The mirrored fields as stored in sync_state"""
+        return json.dumps(sorted(self.fields) if self.fields else None)
+
+    def fields_changed(self) -> bool:
+        """Whether the stored records were synced with a different set of fields"""
+        with self._connect() as conn:
+            return self._get_state(conn, "fields") != self._projection
+
+    def sync(self, full: bool = False) -> int:
+        """
+        Bring the mirror up to date with Airtable
+
+        A delta sync only fetches records modified since the previous sync. A full sync
+        fetches every record and removes rows that no longer exist in Airtable; it runs
+        automatically on the first sync, every FULL_SYNC_INTERVAL seconds and whenever
+        the mirrored fields change.
+
+        Args:
+            full: Force a full sync
+
+        Returns:
+            Number of records written to the mirror
+
+        Raises:
+            requests.exceptions.RequestException: If Airtable could not be reached
+        """
+        with self._sync_lock:
+            with self._connect() as conn:
+                last_sync = self._get_state(conn, "last_sync")
+                last_full_sync = self._get_state(conn, "last_full_sync")
+                projection = self._get_state(conn, "fields")
+
+            now = datetime.now(timezone.utc)
+            if last_sync is None or last_full_sync is None or projection != self._projection:
+                full = True
+            elif now - datetime.fromisoformat(last_full_sync) > timedelta(seconds=FULL_SYNC_INTERVAL):
+                full = True
+
+            if full:
+                formula = None
+            else:
+                watermark = (datetime.fromisoformat(last_sync) - WATERMARK_SKEW).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                formula = f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{watermark}'))"
+
+            # Fetch everything before writing so a failed sync leaves the mirror untouched
+            records = list(self.client.iter_records(filter_by_formula=formula, fields=self.fields))
+
+            with self._connect() as conn:
+                changes_before = conn.total_changes
+                # Rows whose content is unchanged are skipped so they don't count as changes
+                conn.executemany(
+                    "INSERT INTO records (id, created_time, fields) VALUES (?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET created_time = excluded.created_time, fields = excluded.fields "
+                    "WHERE records.fields != excluded.fields OR records.created_time IS NOT excluded.created_time",
+                    [(r["id"], r.get("createdTime"), json.dumps(r.get("fields", {}))) for r in records]
+                )
+                changed = conn.total_changes - changes_before
+                if full:
+                    conn.execute("CREATE TEMP TABLE live_ids (id TEXT PRIMARY KEY)")
+                    conn.executemany("INSERT INTO live_ids (id) VALUES (?)", [(r["id"],) for r in records])
+                    changed += conn.execute("DELETE FROM records WHERE id NOT IN (SELECT id FROM live_ids)").rowcount
+                    conn.execute("DROP TABLE live_ids")
+                    self._set_state(conn, "last_full_sync", now.isoformat())
+                    self._set_state(conn, "fields", self._projection)
+                if changed:
+                    self._set_state(conn, "version", str(int(self._get_state(conn, "version") or 0) + 1))
+                self._set_state(conn, "last_sync", now.isoformat())
+
+            logging.info(f"Airtable mirror {'full' if full else 'delta'} sync wrote {len(records)} records")
+            return len(records)
+
+    def get_version(self) -> int:
+        """
+        Get the mirror's data version, which increases whenever a sync changes records
+
+        Cheap enough to poll; readers in any process can use it to detect new data.
+
+        Returns:
+            Current data version (0 before the first sync)
+        """
+        with self._connect() as conn:
+            return int(self._get_state(conn, "version") or 0)
+
+    def get_records(self) -> List[Dict[str, Any]]:
+        """
+        Get all mirrored records in the same shape the Airtable API returns them
+
+        Returns:
+            List of records from the mirror
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, created_time, fields FROM records").fetchall()
+        return [{"id": row[0], "createdTime": row[1], "fields": json.loads(row[2])} for row in rows]
+
+    def find_by_field(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """
+        Find the first mirrored record whose field equals a value
+
+        Lookups on INDEXED_FIELDS use an index; other fields scan the table.
+
+        Args:
+            field: Name of the field to match
+            value: Value the field must equal
+
+        Returns:
+            Matching record or None if not found
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT id, created_time, fields FROM records WHERE {self._field_expr(field)} = ? LIMIT 1",
+                (value,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "createdTime": row[1], "fields": json.loads(row[2])}
+
+    def _sync_loop(self, interval: float) -> None:
+        while True:
+            try:
+                self.sync()
+            except requests.exceptions.RequestException as e:
+                logging.error(f"Background Airtable mirror sync failed: {str(e)}")
+            except Exception as e:
+                logging.exception(f"Unexpected error in Airtable mirror sync: {str(e)}")
+            time.sleep(interval)
+
+    def start_background_sync(self, interval: float = SYNC_INTERVAL) -> None:
+        """
+        Start a daemon thread that syncs immediately and then every `interval` seconds
+
+        Args:
+            interval: Seconds between syncs
+        """
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            return
+
+        self._sync_thread = threading.Thread(
+            target=self._sync_loop, args=(interval,), name="airtable-mirror-sync", daemon=True
+        )
+        self._sync_thread.start()
+
+
+def get_mirror(client: AirtableClient, db_path: str = MIRROR_DB_FILE,
+               fields: Optional[List[str]] = None) -> AirtableMirror:
+    """
+    Get the process-wide mirror for a database file, creating it and starting its
+    background sync on first use
+
+    The first call blocks on an initial full sync when the database is empty or was
+    synced with different fields; later calls return immediately and never wait on
+    Airtable.
+
+    Args:
+        client: Airtable client for the table being mirrored
+        db_path: Path of the SQLite database file
+        fields: Names of the fields to mirror; all fields are mirrored if omitted
+
+    Returns:
+        Shared AirtableMirror instance
+    """
+    with _mirrors_lock:
+        mirror = _mirrors.get(db_path)
+        if mirror is None:
+            mirror = AirtableMirror(client, db_path, fields)
+            if mirror.is_empty() or mirror.fields_changed():
+                try:
+                    mirror.sync(full=True)
+                except requests.exceptions.RequestException as e:
+                    logging.error(f"Initial Airtable mirror sync failed: {str(e)}")
+            mirror.start_background_sync()
+            client.local_index = mirror
+            _mirrors[db_path] = mirror
+        return mirror
@@ -1,20 +1,328 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import os
 import json
-from typing import Dict, List, Any
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
 
-# File to store analytics data
+from utils.analytics_query import ViewsReport, build_views_report
+from utils.analytics_shards import ShardReader, ShardWriter, ingest_shards
+from utils.analytics_store import AnalyticsReader, AnalyticsStore, get_store
+
+# Legacy analytics file: a single JSON array rewritten on every view
 ANALYTICS_FILE = "analytics_data.json"
+# Legacy append-only analytics log: one JSON event per line
+ANALYTICS_LOG_FILE = os.getenv("ANALYTICS_LOG_FILE", "analytics_data.jsonl")
+# Buffered events are written once this many are pending...
+FLUSH_EVERY_EVENTS = 100
+# ...or at least every this many seconds
+FLUSH_INTERVAL = 5
+# Seconds between moves of this process's shard into the analytics store
+INGEST_INTERVAL = 30
+# Seconds between compactions of raw events older than the retention window
+COMPACT_INTERVAL = 24 * 60 * 60
+# Number of query results kept for repeat dashboard renders
+REPORT_CACHE_ENTRIES = 32
+# Seconds during which repeat views of a company by the same session count once
+VIEW_DEDUP_WINDOW = float(os.getenv("ANALYTICS_VIEW_DEDUP_WINDOW", str(30 * 60)))
+
+_migration_lock = threading.Lock()
+_migration_checked = False
+
+def _read_legacy_events(path: str) -> List[Dict[str, Any]]:
+    """Read events from a legacy JSON array or JSONL file, skipping anything unparseable"""
+    with open(path, "r") as f:
+        text = f.read()
+    try:
+        events = json.loads(text)
+        return events if isinstance(events, list) else []
+    except json.JSONDecodeError:
+        pass
+    
+    events = []
+    for line in text.splitlines():
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return events
+
+def _migrate_legacy_files(store: AnalyticsStore) -> None:
+    """
+    Import events from the legacy JSON and JSONL files into the analytics store, once
 
-def log_view(company_name: str) -> None:
+    Each file is claimed with an atomic rename, so only one process imports it even
+    if several start at once. It is kept as `<name>.migrated` afterwards. If the
+    import fails, the file is put back and the import is retried on the next call;
+    the error is logged rather than raised, so flushes and dashboard reads go on.
+    """
+    global _migration_checked
+    if _migration_checked:
+        return
+    with _migration_lock:
+        if _migration_checked:
+            return
+        complete = True
+        for path in (ANALYTICS_FILE, ANALYTICS_LOG_FILE):
+            if not os.path.exists(path):
+                continue
+            claimed = path + ".migrating"
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                # Another process claimed it first
+                continue
+            try:
+                # add_events is one transaction, so a failure imports nothing
+                imported = store.add_events(_read_legacy_events(claimed))
+            except Exception:
+                logging.exception(f"Failed to import analytics events from {path}; will retry")
+                os.rename(claimed, path)
+                complete = False
+                continue
+            os.rename(claimed, path + ".migrated")
+            logging.info(f"Imported {imported} analytics events from {path}")
+        _migration_checked = complete
+
+class AnalyticsWriter:
+    """
+    Buffers analytics events in memory and appends them to this process's shard in the background
+
+    Logging an event only takes a lock and appends to a list, so page rendering never
+    waits on the filesystem. Pending events are appended to the process's own shard
+    file, with no cross-process locking, every `flush_every` events or
+    `flush_interval` seconds, whichever comes first. The same thread periodically
+    seals the shard and ingests sealed shards (from any process) into the store,
+    compacts old raw events once a day, and does a final flush and ingest at exit.
+    """
+    
+    def __init__(self, store: AnalyticsStore, shard: ShardWriter, flush_every: int = FLUSH_EVERY_EVENTS,
+                 flush_interval: float = FLUSH_INTERVAL):
+        """
+        Initialize the writer
+        
+        Args:
+            store: Analytics store that shards are ingested into
+            shard: This process's shard
+            flush_every: Number of pending events that triggers an early flush
+            flush_interval: Maximum seconds an event waits before being written
+        """
+        self.store = store
+        self.shard = shard
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.ingested_at = time.monotonic()
+        self.compacted_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+    
+    def log(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an event for writing
+        
+        Args:
+            event: Analytics event
+        """
+        with self.lock:
+            self.pending.append(event)
+            full = len(self.pending) >= self.flush_every
+        if full:
+            self.wake.set()
+    
+    def flush(self) -> None:
+        """Append all pending events to the shard now; on failure they stay queued for the next flush"""
+        with self.write_lock:
+            _migrate_legacy_files(self.store)
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                self.shard.append(batch)
+            except Exception:
+                with self.lock:
+                    self.pending[:0] = batch
+                raise
+    
+    def ingest(self) -> int:
+        """
+        Flush, seal this process's shard and move every sealed shard into the store
+        
+        Returns:
+            Number of events ingested
+        """
+        self.flush()
+        with self.write_lock:
+            self.shard.seal()
+        return ingest_shards(self.store, self.shard.shard_dir, own_path=self.shard.path)
+    
+    def _run(self) -> None:
+        while True:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Failed to write analytics events")
+            
+            if time.monotonic() - self.ingested_at >= INGEST_INTERVAL:
+                self.ingested_at = time.monotonic()
+                try:
+                    self.ingest()
+                except Exception:
+                    logging.exception("Failed to ingest analytics shards")
+            
+            if time.monotonic() - self.compacted_at >= COMPACT_INTERVAL:
+                self.compacted_at = time.monotonic()
+                try:
+                    removed = self.store.compact()
+                    if removed:
+                        logging.info(f"Compacted {removed} analytics events into daily aggregates")
+                except Exception:
+                    logging.exception("Failed to compact analytics events")
+    
+    def _shutdown(self) -> None:
+        try:
+            self.ingest()
+        except Exception:
+            # Whatever reached the shard is ingested by the next compactor to run
+            logging.exception("Failed to ingest analytics shards at exit")
+    
+    def start(self) -> None:
+        """Start the background thread and flush and ingest remaining events at exit"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self._shutdown)
+
+_writer: Optional[AnalyticsWriter] = None
+_writer_lock = threading.Lock()
+_shard_reader = ShardReader()
+# Recent reports keyed by filters and the store and shard state they were built from
+_report_cache: "OrderedDict[tuple, ViewsReport]" = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def get_writer() -> AnalyticsWriter:
+    """
+    Get the process-wide analytics writer, starting it on first use
+    
+    Returns:
+        Shared AnalyticsWriter
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                writer = AnalyticsWriter(get_store(), ShardWriter())
+                writer.start()
+                _writer = writer
+    return _writer
+
+@contextmanager
+def _merged_read() -> Iterator[Tuple[AnalyticsReader, List[Dict[str, Any]], tuple]]:
+    """
+    Open a store snapshot together with the shard events it does not contain yet
+    
+    The snapshot is taken before the shards are listed, so events of a shard
+    ingested in between are never counted twice: they are only in the shard, or
+    (if it was already deleted) missing until the next read, whose version differs
+    because the store has grown.
+    
+    Yields:
+        (store reader, pending events, version identifying the combined state)
+    """
+    writer = get_writer()
+    writer.flush()
+    
+    with writer.store.read() as reader:
+        # SQLite fixes the snapshot at the first read of the transaction
+        last_event_id = reader.last_event_id()
+        shards = _shard_reader.read()
+        ingested = reader.ingested_shards(shards)
+        pending = {name: events for name, events in shards.items() if name not in ingested}
+        version = (last_event_id, tuple(sorted((name, len(events)) for name, events in pending.items())))
+        yield reader, [event for events in pending.values() for event in events], version
+
+def get_filter_options() -> Tuple[Optional[date], Optional[date], List[str]]:
+    """
+    Get the range of days with views and the companies that were viewed
+    
+    Returns:
+        (first day, last day, company names); the days are None if there are no views
+    """
+    with _merged_read() as (reader, pending, _):
+        days = [day for day in reader.date_range() if day]
+        companies = {company for company, _ in reader.views_by_company()}
+    days += [str(event.get("timestamp", ""))[:10] for event in pending]
+    companies.update(event.get("company") or "Unknown" for event in pending)
+    if not days:
+        return None, None, sorted(companies)
+    return date.fromisoformat(min(days)), date.fromisoformat(max(days)), sorted(companies)
+
+def query_views(start: Optional[str] = None, end: Optional[str] = None,
+                companies: Optional[Sequence[str]] = None) -> ViewsReport:
+    """
+    Get views for the dashboard, merged from the store and every process's shards
+    
+    Reports are cached and only rebuilt when the filters, the store or a shard change.
+    
+    Args:
+        start: Earliest date (YYYY-MM-DD) to include
+        end: Date to stop before
+        companies: Only include these companies
+    
+    Returns:
+        Totals, top companies, a downsampled views-over-time series and recent views
+    """
+    companies = tuple(sorted(companies)) if companies else None
+    with _merged_read() as (reader, pending, version):
+        key = (version, start, end, companies)
+        with _report_cache_lock:
+            report = _report_cache.get(key)
+            if report is not None:
+                _report_cache.move_to_end(key)
+                return report
+        report = build_views_report(reader, pending, start, end, companies)
+    
+    with _report_cache_lock:
+        _report_cache[key] = report
+        while len(_report_cache) > REPORT_CACHE_ENTRIES:
+            _report_cache.popitem(last=False)
+    return report
+
+def log_view(company_name: str, dedup_window: float = VIEW_DEDUP_WINDOW) -> bool:
     """
     Log a company page view for analytics
     
+    Streamlit reruns the page on every interaction, so a session counts one view
+    per company per `dedup_window` seconds; reruns in between are ignored. The
+    event is buffered in memory and written to the analytics store in the
+    background, so rendering never waits on disk.
+    
     Args:
         company_name: Name of the company being viewed
+        dedup_window: Seconds before the same session's view of the company counts again
+    
+    Returns:
+        True if a view was logged, False if it was a repeat within the window
     """
+    # Last logged view per company for this session
+    viewed = st.session_state.setdefault("_analytics_viewed", {})
+    now = time.monotonic()
+    last_viewed = viewed.get(company_name)
+    if last_viewed is not None and now - last_viewed < dedup_window:
+        return False
+    viewed[company_name] = now
+    
     # Create analytics data
     analytics_data = {
         "company": company_name,
@@ -22,70 +330,87 @@ def log_view(company_name: str) -> None:
         "user_agent": st.session_state.get("_client_user_agent", "Unknown")
     }
     
-    # Load existing analytics
-    all_analytics = []
-    if os.path.exists(ANALYTICS_FILE):
-        try:
-            with open(ANALYTICS_FILE, "r") as f:
-                all_analytics = json.load(f)
-        except json.JSONDecodeError:
-            all_analytics = []
-    
-    # Add new entry
-    all_analytics.append(analytics_data)
-    
-    # Save updated analytics
-    with open(ANALYTICS_FILE, "w") as f:
-        json.dump(all_analytics, f)
+    get_writer().log(analytics_data)
+    return True
 
-def get_analytics_data() -> List[Dict[str, Any]]:
+def get_analytics_data(start: Optional[str] = None, end: Optional[str] = None,
+                       company: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Get all analytics data
+    Get analytics data
+    
+    Only raw events within the store's retention window are returned; older views
+    are kept as daily aggregates.
+    
+    Args:
+        start: Earliest ISO timestamp or date to include
+        end: ISO timestamp or date to stop before
+        company: Only include views of this company
     
     Returns:
-        List of analytics data records
+        List of analytics data records, oldest first
     """
-    if not os.path.exists(ANALYTICS_FILE):
-        return []
+    with _merged_read() as (reader, pending, _):
+        events = reader.get_events(start=start, end=end, company=company)
     
-    try:
-        with open(ANALYTICS_FILE, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return []
+    # Merge in events not yet ingested from the shards
+    for event in pending:
+        timestamp = str(event.get("timestamp", ""))
+        if start is not None and timestamp < start:
+            continue
+        if end is not None and timestamp >= end:
+            continue
+        if company is not None and event.get("company") != company:
+            continue
+        events.append(event)
+    events.sort(key=lambda event: str(event.get("timestamp", "")))
+    return events
 
 def display_analytics() -> None:
-    """Display analytics dashboard"""
-    
-    # Get analytics data
-    analytics_data = get_analytics_data()
+    """Display analytics dashboard from the incrementally maintained aggregates"""
     
-    if not analytics_data:
+    first_day, last_day, companies = get_filter_options()
+    if first_day is None:
         st.info("No analytics data available yet.")
         return
     
-    # Convert to DataFrame
-    df = pd.DataFrame(analytics_data)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    # Filters
+    col1, col2 = st.columns(2)
+    with col1:
+        date_range = st.date_input("Date range", value=(first_day, last_day), min_value=first_day,
+                                   max_value=max(last_day, date.today()))
+    with col2:
+        selected_companies = st.multiselect("Companies", companies, placeholder="All companies")
+    
+    # The date picker returns a single day while a range is being chosen
+    if not isinstance(date_range, (tuple, list)):
+        date_range = (date_range,)
+    start_day = date_range[0] if date_range else first_day
+    end_day = date_range[1] if len(date_range) > 1 else start_day
+    
+    report = query_views(start_day.isoformat(), (end_day + timedelta(days=1)).isoformat(), selected_companies)
     
     # Display total views
     st.subheader("Total Page Views")
-    st.metric("Total Views", len(df))
+    st.metric("Total Views", report.total)
+    
+    if not report.total:
+        st.info("No views match these filters.")
+        return
     
     # Display views by company
     st.subheader("Views by Company")
-    company_counts = df["company"].value_counts().reset_index()
-    company_counts.columns = ["Company", "Views"]
-    st.bar_chart(company_counts.set_index("Company"))
+    if report.company_count > len(report.by_company):
+        st.caption(f"Top {len(report.by_company)} of {report.company_count} companies")
+    st.bar_chart(report.by_company.set_index("Company"))
     
     # Display views over time
     st.subheader("Views Over Time")
-    df["date"] = df["timestamp"].dt.date
-    date_counts = df.groupby("date").size().reset_index(name="Views")
-    st.line_chart(date_counts.set_index("date"))
+    if report.bucket_days > 1:
+        st.caption(f"Each point is the total for {report.bucket_days} days")
+    st.line_chart(report.over_time)
     
     # Display recent views
     st.subheader("Recent Views")
-    recent_df = df.sort_values("timestamp", ascending=False).head(10)
+    recent_df = report.recent.copy()
     recent_df["time"] = recent_df["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
     st.table(recent_df[["company", "time", "user_agent"]])
@@ -0,0 +1,127 @@
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import List, Dict, Any, Optional, Sequence
+
+import pandas as pd
+
+from utils.analytics_store import AnalyticsReader
+
+# Maximum number of points in a views-over-time series, whatever the date range
+MAX_CHART_POINTS = 180
+# Number of companies shown individually in views by company
+TOP_COMPANIES = 25
+# Number of most recent views included
+RECENT_VIEWS = 10
+
+
+@dataclass(frozen=True)
+class ViewsReport:
+    """Views for a date range and set of companies, sized for display"""
+    total: int
+    company_count: int
+    by_company: pd.DataFrame
+    over_time: pd.DataFrame
+    bucket_days: int
+    recent: pd.DataFrame
+
+
+def events_frame(events: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build a compact DataFrame of view events
+
+    Company and user agent repeat heavily, so they are stored as categoricals
+    (one small integer code per row plus a dictionary of distinct values) rather
+    than as Python string objects.
+
+    Args:
+        events: Analytics events
+
+    Returns:
+        DataFrame with company, timestamp and user_agent columns
+    """
+    df = pd.DataFrame(events, columns=["company", "timestamp", "user_agent"])
+    df["company"] = df["company"].astype("category")
+    df["user_agent"] = df["user_agent"].fillna("Unknown").astype("category")
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    return df
+
+
+def _in_range(event: Dict[str, Any], start: Optional[str], end: Optional[str],
+              companies: Optional[Sequence[str]]) -> bool:
+    day = str(event.get("timestamp", ""))[:10]
+    if start is not None and day < start:
+        return False
+    if end is not None and day >= end:
+        return False
+    return companies is None or event.get("company") in companies
+
+
+def build_views_report(reader: AnalyticsReader, pending: List[Dict[str, Any]], start: Optional[str] = None,
+                       end: Optional[str] = None, companies: Optional[Sequence[str]] = None,
+                       max_points: int = MAX_CHART_POINTS, top_companies: int = TOP_COMPANIES,
+                       recent: int = RECENT_VIEWS) -> ViewsReport:
+    """
+    Query views from the store's daily aggregates plus events not yet ingested
+
+    Aggregation and downsampling happen in SQL, so the result holds at most one
+    row per company, `max_points` time buckets and `recent` events, however long
+    the history is.
+
+    Args:
+        reader: Store snapshot to query
+        pending: Events from shards not yet in the store
+        start: Earliest date (YYYY-MM-DD) to include
+        end: Date to stop before
+        companies: Only include these companies
+        max_points: Maximum number of points in the views-over-time series
+        top_companies: Number of companies listed in by_company
+        recent: Number of most recent views to include
+
+    Returns:
+        Report for display
+    """
+    pending = [event for event in pending if _in_range(event, start, end, companies)]
+
+    by_company = Counter(dict(reader.views_by_company(start, end, companies)))
+    by_company.update(event.get("company") or "Unknown" for event in pending)
+
+    # Pick the bucket width that keeps the series within the point budget
+    first, last = reader.date_range()
+    pending_days = sorted(str(event.get("timestamp", ""))[:10] for event in pending)
+    days = [day for day in (first, last, *pending_days) if day]
+    origin = start or (min(days) if days else None)
+    final = (date.fromisoformat(end) - timedelta(days=1)).isoformat() if end else (max(days) if days else None)
+    span = (date.fromisoformat(final) - date.fromisoformat(origin)).days + 1 if origin and final else 1
+    bucket_days = max(1, math.ceil(span / max_points))
+
+    over_time = Counter()
+    if origin is not None:
+        over_time.update(dict(reader.views_over_time(origin, bucket_days, start, end, companies)))
+        # Fold pending views into the bucket of the stored series they fall in
+        bucket_starts = {}
+        for day in sorted(over_time):
+            bucket_starts.setdefault((date.fromisoformat(day) - date.fromisoformat(origin)).days // bucket_days, day)
+        for day in pending_days:
+            bucket = (date.fromisoformat(day) - date.fromisoformat(origin)).days // bucket_days
+            over_time[bucket_starts.setdefault(bucket, day)] += 1
+
+    series = pd.DataFrame(sorted(over_time.items()), columns=["date", "Views"])
+    series["date"] = pd.to_datetime(series["date"])
+
+    top = by_company.most_common(top_companies)
+    company_frame = pd.DataFrame(top, columns=["Company", "Views"])
+    company_frame["Company"] = company_frame["Company"].astype("category")
+
+    recent_events = reader.get_events(start, end, companies, limit=recent) + pending
+    recent_events.sort(key=lambda event: str(event.get("timestamp", "")), reverse=True)
+
+    return ViewsReport(
+        total=sum(by_company.values()),
+        company_count=len(by_company),
+        by_company=company_frame,
+        over_time=series.set_index("date"),
+        bucket_days=bucket_days,
+        recent=events_frame(recent_events[:recent])
+    )
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import socket
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from utils.analytics_store import AnalyticsStore
+
+# Directory holding the per-process analytics shard files
+SHARD_DIR = os.getenv("ANALYTICS_SHARD_DIR", "analytics_shards")
+# Suffix of a shard still being appended to by its process
+ACTIVE_SUFFIX = ".jsonl"
+# Suffix of a shard closed for writing and waiting to be ingested
+SEALED_SUFFIX = ".sealed"
+# Seconds without writes after which another process's active shard is treated as
+# abandoned (e.g. its process died) and sealed by whichever compactor sees it
+STALE_SHARD_AFTER = 60 * 60
+
+
+def _append_lines(path: str, events: List[Dict[str, Any]]) -> None:
+    """
+    Append events to a JSONL file with a single O_APPEND write
+
+    The kernel positions every O_APPEND write at the current end of file, so a
+    reader never sees another writer's bytes interleaved with ours.
+    """
+    if not events:
+        return
+    data = "".join(json.dumps(event) + "\n" for event in events).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def _parse_lines(data: bytes) -> List[Dict[str, Any]]:
+    """Parse complete JSONL lines, skipping any that are torn or malformed"""
+    events = []
+    for line in data.splitlines():
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return events
+
+
+class ShardWriter:
+    """
+    Appends this process's analytics events to its own shard file
+
+    No other process writes to the shard, so appends need no locking. The owner
+    seals the shard (renames it to a unique sealed name) before it is ingested;
+    the next append starts a new active shard.
+    """
+
+    def __init__(self, shard_dir: str = SHARD_DIR):
+        """
+        Initialize the writer
+
+        Args:
+            shard_dir: Directory holding the shard files
+        """
+        self.shard_dir = shard_dir
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self.path = os.path.join(shard_dir, self.name + ACTIVE_SUFFIX)
+        os.makedirs(shard_dir, exist_ok=True)
+
+    def append(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Append events to the active shard
+
+        Args:
+            events: Analytics events
+        """
+        _append_lines(self.path, events)
+
+    def seal(self) -> Optional[str]:
+        """
+        Close the active shard for writing so it can be ingested
+
+        Must not run concurrently with append.
+
+        Returns:
+            Path of the sealed shard, or None if there was nothing to seal
+        """
+        return _seal(self.path, self.shard_dir, self.name)
+
+
+def _seal(path: str, shard_dir: str, name: str) -> Optional[str]:
+    sealed_path = os.path.join(shard_dir, f"{name}-{time.time_ns()}{SEALED_SUFFIX}")
+    try:
+        if os.path.getsize(path) == 0:
+            return None
+        os.rename(path, sealed_path)
+    except FileNotFoundError:
+        return None
+    return sealed_path
+
+
+def ingest_shards(store: AnalyticsStore, shard_dir: str = SHARD_DIR, own_path: Optional[str] = None) -> int:
+    """
+    Move sealed shards into the analytics store and delete them
+
+    Each shard is stored in one transaction that also records its name, so a shard
+    ingested by two compactors at once, or again after a crash before its file was
+    deleted, is only counted once. Active shards of other processes that have not
+    been written to for STALE_SHARD_AFTER seconds are sealed first.
+
+    Args:
+        store: Analytics store to ingest into
+        shard_dir: Directory holding the shard files
+        own_path: This process's active shard, which is never treated as abandoned
+
+    Returns:
+        Number of events ingested
+    """
+    if not os.path.isdir(shard_dir):
+        return 0
+
+    ingested = 0
+    for entry in sorted(os.scandir(shard_dir), key=lambda entry: entry.name):
+        if entry.name.endswith(ACTIVE_SUFFIX) and entry.path != own_path:
+            try:
+                if time.time() - entry.stat().st_mtime < STALE_SHARD_AFTER:
+                    continue
+            except FileNotFoundError:
+                continue
+            path = _seal(entry.path, shard_dir, entry.name[:-len(ACTIVE_SUFFIX)])
+            if path is None:
+                continue
+        elif entry.name.endswith(SEALED_SUFFIX):
+            path = entry.path
+        else:
+            continue
+
+        try:
+            with open(path, "rb") as f:
+                events = _parse_lines(f.read())
+        except FileNotFoundError:
+            # Another compactor ingested and deleted it
+            continue
+        ingested += store.add_events(events, shard=os.path.basename(path))
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    return ingested
+
+
+class ShardReader:
+    """
+    Reads events from shards that have not been ingested yet, caching what it has parsed
+
+    Sealed shards never change, so each is parsed once. Active shards only grow, so
+    a refresh parses just the bytes appended since the last read.
+    """
+
+    def __init__(self, shard_dir: str = SHARD_DIR):
+        """
+        Initialize the reader
+
+        Args:
+            shard_dir: Directory holding the shard files
+        """
+        self.shard_dir = shard_dir
+        # path -> (inode, bytes parsed, events)
+        self._cache: Dict[str, Tuple[int, int, List[Dict[str, Any]]]] = {}
+        self.lock = threading.Lock()
+
+    def read(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get the events in every shard file
+
+        Returns:
+            Events keyed by shard file name
+        """
+        with self.lock:
+            shards: Dict[str, List[Dict[str, Any]]] = {}
+            cache: Dict[str, Tuple[int, int, List[Dict[str, Any]]]] = {}
+            if not os.path.isdir(self.shard_dir):
+                self._cache = cache
+                return shards
+
+            for entry in os.scandir(self.shard_dir):
+                if not entry.name.endswith((ACTIVE_SUFFIX, SEALED_SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                    inode, offset, events = self._cache.get(entry.path, (stat.st_ino, 0, []))
+                    if inode != stat.st_ino or stat.st_size < offset:
+                        # A new file under the same name (the old one was sealed)
+                        offset, events = 0, []
+                    if stat.st_size > offset:
+                        with open(entry.path, "rb") as f:
+                            f.seek(offset)
+                            data = f.read(stat.st_size - offset)
+                        # Leave a partially written last line for the next read
+                        end = data.rfind(b"\n") + 1
+                        events = events + _parse_lines(data[:end])
+                        offset += end
+                except FileNotFoundError:
+                    continue
+                cache[entry.path] = (stat.st_ino, offset, events)
+                shards[entry.name] = events
+
+            self._cache = cache
+            return shards
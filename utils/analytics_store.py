@@ -0,0 +1,317 @@
+import os
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Sequence, Set, Tuple, Union
+
+# SQLite file holding analytics events and aggregates
+ANALYTICS_DB_FILE = os.getenv("ANALYTICS_DB", "analytics.db")
+# Days raw events are kept; older views survive only in the daily aggregates
+RETENTION_DAYS = 90
+
+# A single company name or a list of them
+CompanyFilter = Union[str, Sequence[str], None]
+
+# Process-wide stores keyed by database path
+_stores: Dict[str, "AnalyticsStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class AnalyticsReader:
+    """Queries against one consistent snapshot of the store"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def get_events(self, start: Optional[str] = None, end: Optional[str] = None,
+                   company: CompanyFilter = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """See AnalyticsStore.get_events"""
+        conditions, params = _range_conditions("timestamp", start, end, company)
+        query = f"SELECT company, timestamp, user_agent FROM events {conditions} ORDER BY timestamp DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        rows = self.conn.execute(query, params).fetchall()
+        return [{"company": c, "timestamp": t, "user_agent": ua} for c, t, ua in reversed(rows)]
+
+    def get_daily_views(self, start: Optional[str] = None, end: Optional[str] = None,
+                        company: CompanyFilter = None) -> List[Tuple[str, str, int]]:
+        """See AnalyticsStore.get_daily_views"""
+        conditions, params = _range_conditions("date", start, end, company)
+        return self.conn.execute(
+            f"SELECT date, company, views FROM daily_views {conditions} ORDER BY date, company", params
+        ).fetchall()
+
+    def date_range(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get the first and last days with views
+
+        Returns:
+            (first, last) dates as YYYY-MM-DD, or (None, None) if there are no views
+        """
+        return self.conn.execute("SELECT MIN(date), MAX(date) FROM daily_views").fetchone()
+
+    def views_by_company(self, start: Optional[str] = None, end: Optional[str] = None,
+                         company: CompanyFilter = None) -> List[Tuple[str, int]]:
+        """
+        Get total views per company from the daily aggregates
+
+        Args:
+            start: Earliest date (YYYY-MM-DD) to include
+            end: Date to stop before
+            company: Only include this company, or these companies
+
+        Returns:
+            (company, views) tuples, most viewed first
+        """
+        conditions, params = _range_conditions("date", start, end, company)
+        return self.conn.execute(
+            f"SELECT company, SUM(views) AS total FROM daily_views {conditions} "
+            "GROUP BY company ORDER BY total DESC", params
+        ).fetchall()
+
+    def views_over_time(self, origin: str, bucket_days: int, start: Optional[str] = None,
+                        end: Optional[str] = None, company: CompanyFilter = None) -> List[Tuple[str, int]]:
+        """
+        Get views summed into fixed-width buckets of days, computed in SQL
+
+        Args:
+            origin: Date (YYYY-MM-DD) the first bucket starts on
+            bucket_days: Number of days per bucket
+            start: Earliest date to include
+            end: Date to stop before
+            company: Only include this company, or these companies
+
+        Returns:
+            (first date with views in the bucket, views) tuples in date order
+        """
+        conditions, params = _range_conditions("date", start, end, company)
+        return self.conn.execute(
+            f"SELECT MIN(date), SUM(views) FROM daily_views {conditions} "
+            "GROUP BY CAST((julianday(date) - julianday(?)) / ? AS INTEGER) ORDER BY 1",
+            params + [origin, bucket_days]
+        ).fetchall()
+
+    def ingested_shards(self, names: Iterable[str]) -> Set[str]:
+        """
+        Find which of the given shard files already have their events in the store
+
+        Args:
+            names: Shard file names
+
+        Returns:
+            The names that were ingested
+        """
+        names = list(names)
+        ingested = set()
+        # Stay well below SQLite's limit on bound parameters
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            ingested.update(name for name, in self.conn.execute(
+                f"SELECT name FROM ingested_shards WHERE name IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return ingested
+
+    def last_event_id(self) -> int:
+        """ID of the newest stored event; changes whenever events are added"""
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+
+def _range_conditions(column: str, start: Optional[str], end: Optional[str],
+                      company: CompanyFilter) -> Tuple[str, List[Any]]:
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} < ?")
+        params.append(end)
+    if isinstance(company, str):
+        conditions.append("company = ?")
+        params.append(company)
+    elif company is not None:
+        conditions.append(f"company IN ({','.join('?' * len(company))})")
+        params.extend(company)
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+class AnalyticsStore:
+    """
+    SQLite analytics store
+
+    Raw view events are indexed by timestamp and by company for range queries.
+    Daily view counts per company are maintained in the same transaction as each
+    insert, so aggregates never need a scan of the events, and compaction only has
+    to delete raw events older than the retention window.
+    """
+
+    def __init__(self, db_path: str = ANALYTICS_DB_FILE):
+        """
+        Initialize the store
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; WAL mode lets dashboards read while other processes write"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _create_schema(self) -> None:
+        """Create the analytics tables if they do not exist yet"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    user_agent TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_company ON events (company, timestamp)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_views (
+                    date TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    views INTEGER NOT NULL,
+                    PRIMARY KEY (date, company)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingested_shards (
+                    name TEXT PRIMARY KEY,
+                    ingested_at TEXT NOT NULL
+                )
+            """)
+
+    def add_events(self, events: Iterable[Dict[str, Any]], shard: Optional[str] = None) -> int:
+        """
+        Store view events and count them in the daily aggregates, in one transaction
+
+        Args:
+            events: Analytics events with company, timestamp and user_agent
+            shard: Name of the shard file the events come from; a shard that was
+                already ingested is skipped, so ingesting is safe to retry
+
+        Returns:
+            Number of events stored
+        """
+        rows = [
+            (str(event.get("timestamp", "")), event.get("company") or "Unknown", event.get("user_agent"))
+            for event in events
+        ]
+        if not rows and shard is None:
+            return 0
+
+        daily = Counter((timestamp[:10], company) for timestamp, company, _ in rows)
+        with self._connect() as conn:
+            if shard is not None:
+                try:
+                    conn.execute(
+                        "INSERT INTO ingested_shards (name, ingested_at) VALUES (?, ?)",
+                        (shard, datetime.now().isoformat())
+                    )
+                except sqlite3.IntegrityError:
+                    return 0
+            conn.executemany("INSERT INTO events (timestamp, company, user_agent) VALUES (?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT INTO daily_views (date, company, views) VALUES (?, ?, ?) "
+                "ON CONFLICT (date, company) DO UPDATE SET views = views + excluded.views",
+                [(date, company, views) for (date, company), views in daily.items()]
+            )
+        return len(rows)
+
+    @contextmanager
+    def read(self) -> Iterator[AnalyticsReader]:
+        """
+        Open a read transaction; every query made through the reader sees the same snapshot
+
+        Yields:
+            Reader bound to the transaction
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            yield AnalyticsReader(conn)
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def get_events(self, start: Optional[str] = None, end: Optional[str] = None,
+                   company: CompanyFilter = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get raw view events, oldest first
+
+        Only events within the retention window are available.
+
+        Args:
+            start: Earliest ISO timestamp or date to include
+            end: ISO timestamp or date to stop before
+            company: Only include views of this company, or these companies
+            limit: Maximum number of events to return (the most recent ones)
+
+        Returns:
+            Events with company, timestamp and user_agent
+        """
+        with self.read() as reader:
+            return reader.get_events(start, end, company, limit)
+
+    def get_daily_views(self, start: Optional[str] = None, end: Optional[str] = None,
+                        company: CompanyFilter = None) -> List[Tuple[str, str, int]]:
+        """
+        Get daily view counts, including days older than the retention window
+
+        Args:
+            start: Earliest date (YYYY-MM-DD) to include
+            end: Date to stop before
+            company: Only include views of this company, or these companies
+
+        Returns:
+            (date, company, views) tuples ordered by date
+        """
+        with self.read() as reader:
+            return reader.get_daily_views(start, end, company)
+
+    def compact(self, retention_days: int = RETENTION_DAYS) -> int:
+        """
+        Drop raw events older than the retention window
+
+        Their views are already counted in the daily aggregates, so totals and
+        history charts are unaffected. Records of shards ingested before the
+        window are dropped too; their files were deleted long ago.
+
+        Args:
+            retention_days: Days of raw events to keep
+
+        Returns:
+            Number of events removed
+        """
+        cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM events WHERE timestamp < ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM ingested_shards WHERE ingested_at < ?", (cutoff,))
+        return removed
+
+
+def get_store(db_path: str = ANALYTICS_DB_FILE) -> AnalyticsStore:
+    """
+    Get the process-wide analytics store for a database file
+
+    Args:
+        db_path: Path of the SQLite database file
+
+    Returns:
+        Shared AnalyticsStore
+    """
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = AnalyticsStore(db_path)
+        return store
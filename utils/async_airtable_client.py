@@ -0,0 +1,252 @@
+import time
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, AsyncIterator
+
+import aiohttp
+
+from utils import http_client
+from utils.airtable_client import (
+    MAX_PAGE_SIZE, METADATA_CACHE_TTL, _load_metadata_cache, _save_metadata_cache
+)
+
+# Maximum simultaneous connections per client
+CONNECTION_LIMIT = 20
+
+
+class AsyncAirtableClient:
+    """
+    Asyncio client for the Airtable API with the same surface as AirtableClient
+
+    Requests draw from the same process-wide token buckets as the synchronous
+    transport (see utils.http_client), so any number of concurrent tasks and clients
+    stay within Airtable's per-base rate limit. Use as an async context manager:
+
+        async with AsyncAirtableClient(pat, base_name, table_name) as client:
+            records = await asyncio.gather(*(client.get_record(i) for i in record_ids))
+    """
+
+    def __init__(self, pat: str, base_name: str, table_name: str, api_url: str = "https://api.airtable.com"):
+        """
+        Initialize the Airtable client
+
+        Args:
+            pat: Personal Access Token for Airtable
+            base_name: Name of the Airtable base
+            table_name: Name of the table within the base
+            api_url: Root URL of the Airtable API (overridable for local stand-in servers)
+        """
+        self.pat = pat
+        self.base_name = base_name
+        self.table_name = table_name
+        self.api_url = api_url.rstrip("/")
+        self.base_id = None
+        self.table_id = None
+        self.headers = {
+            "Authorization": f"Bearer {self.pat}",
+            "Content-Type": "application/json"
+        }
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._ids_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "AsyncAirtableClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Open the underlying connection pool"""
+        if self.session is None or self.session.closed:
+            timeout = aiohttp.ClientTimeout(
+                connect=http_client.DEFAULT_TIMEOUT[0], sock_read=http_client.DEFAULT_TIMEOUT[1]
+            )
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=timeout,
+                connector=aiohttp.TCPConnector(limit=CONNECTION_LIMIT)
+            )
+
+    async def close(self) -> None:
+        """Close the underlying connection pool"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> Any:
+        """
+        Send a request with rate limiting and retries, returning the decoded JSON body
+
+        Mirrors http_client.request: retries on connection errors and 429/5xx with
+        jittered backoff (all Airtable methods used here are idempotent).
+
+        Raises:
+            aiohttp.ClientError: If the request fails on every attempt
+            asyncio.TimeoutError: If the final attempt times out
+        """
+        await self.open()
+        # Rate limit on the public URL so the key matches the synchronous transport
+        bucket = http_client.get_bucket(url.replace(self.api_url, "https://api.airtable.com", 1))
+
+        attempt = 0
+        while True:
+            if bucket is not None:
+                wait = bucket.reserve()
+                if wait:
+                    await asyncio.sleep(wait)
+
+            retry_after = None
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status not in http_client.RETRY_STATUS_CODES or attempt >= http_client.MAX_RETRIES:
+                        response.raise_for_status()
+                        return await response.json()
+                    retry_after = response.headers.get("Retry-After")
+                    logging.warning(f"{method} {url} returned {response.status}, retrying")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= http_client.MAX_RETRIES:
+                    raise
+                logging.warning(f"{method} {url} failed ({str(e) or type(e).__name__}), retrying")
+
+            await asyncio.sleep(http_client.backoff_delay(attempt, retry_after))
+            attempt += 1
+
+    async def _get_base_and_table_ids(self) -> None:
+        """Get the base ID and table ID from base name and table name, using the shared metadata cache"""
+        async with self._ids_lock:
+            if self.base_id and self.table_id:
+                return
+
+            cache_key = f"{self.base_name}/{self.table_name}"
+            entry = _load_metadata_cache().get(cache_key)
+            if entry and time.time() - entry.get("resolved_at", 0) <= METADATA_CACHE_TTL:
+                self.base_id = entry.get("base_id")
+                self.table_id = entry.get("table_id")
+                if self.base_id and self.table_id:
+                    return
+
+            bases = (await self._request("GET", f"{self.api_url}/v0/meta/bases")).get("bases", [])
+            matching_base = next((base for base in bases if base.get("name") == self.base_name), None)
+            if not matching_base:
+                raise ValueError(f"Base '{self.base_name}' not found")
+            base_id = matching_base.get("id")
+
+            tables_url = f"{self.api_url}/v0/meta/bases/{base_id}/tables"
+            tables = (await self._request("GET", tables_url)).get("tables", [])
+            matching_table = next((table for table in tables if table.get("name") == self.table_name), None)
+            if not matching_table:
+                raise ValueError(f"Table '{self.table_name}' not found in base '{self.base_name}'")
+
+            self.base_id = base_id
+            self.table_id = matching_table.get("id")
+
+            cache = _load_metadata_cache()
+            cache[cache_key] = {"base_id": self.base_id, "table_id": self.table_id, "resolved_at": time.time()}
+            _save_metadata_cache(cache)
+
+    async def _table_url(self) -> str:
+        if not self.base_id or not self.table_id:
+            await self._get_base_and_table_ids()
+        return f"{self.api_url}/v0/{self.base_id}/{self.table_id}"
+
+    async def iter_records(self, page_size: int = MAX_PAGE_SIZE, filter_by_formula: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream records from the Airtable table, following the offset cursor page by page
+
+        A failed page raises rather than ending the stream, so callers never mistake
+        a partial table for the whole one.
+
+        Args:
+            page_size: Number of records requested per page (1-100)
+            filter_by_formula: Airtable formula records must satisfy (optional)
+            fields: Names of the fields to return; all fields are returned if omitted
+
+        Yields:
+            Records from the table, one at a time
+
+        Raises:
+            aiohttp.ClientError: If a page could not be fetched
+            asyncio.TimeoutError: If a page timed out on every attempt
+        """
+        try:
+            records_url = await self._table_url()
+            params = [("pageSize", str(max(1, min(page_size, MAX_PAGE_SIZE))))]
+            if filter_by_formula:
+                params.append(("filterByFormula", filter_by_formula))
+            for field in fields or []:
+                params.append(("fields[]", field))
+
+            offset = None
+            while True:
+                page_params = params + [("offset", offset)] if offset else params
+                page = await self._request("GET", records_url, params=page_params)
+
+                for record in page.get("records", []):
+                    yield record
+
+                # Airtable only returns an offset while more pages remain
+                offset = page.get("offset")
+                if not offset:
+                    return
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Error fetching records from Airtable: {str(e)}")
+            raise
+
+    async def get_all_records(self, page_size: int = MAX_PAGE_SIZE, filter_by_formula: Optional[str] = None,
+                              fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Get all records from the Airtable table
+
+        If any page fails, the error is raised instead of returning the records
+        fetched so far, so a partial list is never mistaken for the whole table.
+
+        Args:
+            page_size: Number of records requested per page (1-100)
+            filter_by_formula: Airtable formula records must satisfy (optional)
+            fields: Names of the fields to return; all fields are returned if omitted
+
+        Returns:
+            List of records from the table
+
+        Raises:
+            aiohttp.ClientError: If any page could not be fetched
+            asyncio.TimeoutError: If a page timed out on every attempt
+        """
+        return [record async for record in self.iter_records(page_size, filter_by_formula, fields)]
+
+    async def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific record by ID
+
+        Args:
+            record_id: ID of the record to retrieve
+
+        Returns:
+            Record data or None if not found
+        """
+        try:
+            return await self._request("GET", f"{await self._table_url()}/{record_id}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Error fetching record from Airtable: {str(e)}")
+            return None
+
+    async def update_record(self, record_id: str, fields: Dict[str, Any]) -> bool:
+        """
+        Update a specific record
+
+        Args:
+            record_id: ID of the record to update
+            fields: Dictionary of field names and values to update
+
+        Returns:
+            True if update was successful, False otherwise
+        """
+        try:
+            await self._request("PATCH", f"{await self._table_url()}/{record_id}", json={"fields": fields})
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Error updating record in Airtable: {str(e)}")
+            return False
@@ -0,0 +1,155 @@
+import re
+import heapq
+import bisect
+from itertools import chain
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+# Field holding the company name in Airtable records
+NAME_FIELD = "Company Name"
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _fold(text: str) -> str:
+    """Normalize text for matching: case-folded with whitespace collapsed"""
+    return " ".join(text.casefold().split())
+
+
+def _trigrams(text: str) -> set:
+    """Trigrams of folded text, padded so word starts and ends carry weight"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyIndex:
+    """
+    Immutable in-memory index over company records for lookup and search-as-you-type
+
+    Built once per dataset version; every query afterwards works on precomputed
+    structures: a name dict, a sorted name array, sorted name and word prefix arrays
+    searched with bisect, and trigram posting lists for fuzzy matching.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        """
+        Build the index
+
+        Args:
+            records: Airtable records; those without a company name are skipped
+        """
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            name = record.get("fields", {}).get(NAME_FIELD)
+            if name:
+                self.by_name[name] = record
+
+        # Sorted alphabetically, as the sidebar lists them
+        self.names: List[str] = sorted(self.by_name)
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        folded_names = [_fold(name) for name in self.names]
+
+        self._name_prefixes: List[Tuple[str, int]] = sorted((folded, i) for i, folded in enumerate(folded_names))
+        self._word_prefixes: List[Tuple[str, int]] = sorted(
+            (word, i) for i, folded in enumerate(folded_names) for word in set(_WORD_RE.findall(folded))
+        )
+
+        postings = defaultdict(list)
+        for i, folded in enumerate(folded_names):
+            for trigram in _trigrams(folded):
+                postings[trigram].append(i)
+        self._trigram_postings: Dict[str, List[int]] = dict(postings)
+        self._trigram_counts = [len(_trigrams(folded)) for folded in folded_names]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the record for an exact company name
+
+        Args:
+            name: Company name
+
+        Returns:
+            Record or None if not found
+        """
+        return self.by_name.get(name)
+
+    def position(self, name: str) -> Optional[int]:
+        """
+        Get the position of a company in `names`
+
+        Args:
+            name: Company name
+
+        Returns:
+            Index into `names` or None if not found
+        """
+        return self._positions.get(name)
+
+    @staticmethod
+    def _prefix_matches(entries: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        for position in range(bisect.bisect_left(entries, (prefix, -1)), len(entries)):
+            folded, i = entries[position]
+            if not folded.startswith(prefix):
+                break
+            yield i
+
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        """
+        Find companies matching a partial or misspelled name
+
+        Results are ranked: names starting with the query, then names with a word
+        starting with the query, then fuzzy matches by trigram similarity.
+
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of names to return
+
+        Returns:
+            Matching company names, best first
+        """
+        folded = _fold(query)
+        if not folded:
+            return self.names[:limit]
+
+        results: List[int] = []
+        seen = set()
+
+        def add(indexes: Iterable[int]) -> bool:
+            for i in indexes:
+                if i not in seen:
+                    seen.add(i)
+                    results.append(i)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        if add(self._prefix_matches(self._name_prefixes, folded)):
+            return [self.names[i] for i in results]
+
+        # Every word of the query must prefix some word of the name
+        words = _WORD_RE.findall(folded)
+        if words:
+            candidates = set(self._prefix_matches(self._word_prefixes, words[0]))
+            for word in words[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(self._prefix_matches(self._word_prefixes, word))
+            if add(sorted(candidates)):
+                return [self.names[i] for i in results]
+
+        # Fuzzy fallback needs at least one full trigram of real characters
+        if len(folded) >= 3:
+            query_trigrams = _trigrams(folded)
+            shared = Counter(chain.from_iterable(self._trigram_postings.get(t, ()) for t in query_trigrams))
+
+            # Dice coefficient; require a reasonable overlap to avoid noise
+            query_count = len(query_trigrams)
+            counts = self._trigram_counts
+            scored = [(2 * count / (query_count + counts[i]), i) for i, count in shared.items()]
+            best = heapq.nlargest(limit, (item for item in scored if item[0] >= 0.3), key=lambda item: item[0])
+            add(i for _, i in best)
+
+        return [self.names[i] for i in results]
@@ -0,0 +1,126 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+from utils.airtable_mirror import AirtableMirror
+from utils.company_index import CompanyIndex
+
+# Seconds between checks of the mirror's data version
+REFRESH_INTERVAL = 10
+
+# Process-wide stores keyed by mirror database path
+_stores: Dict[str, "CompanyStore"] = {}
+_stores_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class CompanySnapshot:
+    """Immutable view of the company directory at one mirror version"""
+    records: Tuple[Dict[str, Any], ...]
+    index: CompanyIndex
+    version: int
+    loaded_at: float
+
+
+class CompanyStore:
+    """
+    Process-wide, read-only company directory served stale-while-revalidate
+
+    Every session reads the same snapshot object, so reruns neither copy the dataset
+    nor wait on I/O. A background thread polls the mirror's data version and, when it
+    changes, loads a new snapshot and swaps it in with a single reference assignment.
+    Callers must treat the records as read-only.
+    """
+
+    def __init__(self, mirror: AirtableMirror):
+        """
+        Initialize the store and load the first snapshot
+
+        Args:
+            mirror: Local mirror the directory is read from
+        """
+        self.mirror = mirror
+        self._snapshot = self._load()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def _load(self) -> CompanySnapshot:
+        # Read the version first so a sync landing mid-load is picked up next poll
+        version = self.mirror.get_version()
+        records = tuple(self.mirror.get_records())
+        # The index is built here, off the render path, and only when the data changed
+        return CompanySnapshot(records=records, index=CompanyIndex(records), version=version, loaded_at=time.time())
+
+    @property
+    def snapshot(self) -> CompanySnapshot:
+        """The current snapshot; never blocks"""
+        return self._snapshot
+
+    @property
+    def records(self) -> Tuple[Dict[str, Any], ...]:
+        """Records of the current snapshot; never blocks"""
+        return self._snapshot.records
+
+    @property
+    def index(self) -> CompanyIndex:
+        """Search index of the current snapshot; never blocks"""
+        return self._snapshot.index
+
+    def refresh(self) -> bool:
+        """
+        Load a new snapshot if the mirror has changed since the current one
+
+        Returns:
+            True if a new snapshot was swapped in, False otherwise
+        """
+        if self.mirror.get_version() == self._snapshot.version:
+            return False
+
+        self._snapshot = self._load()
+        logging.info(f"Company store refreshed to version {self._snapshot.version} "
+                     f"({len(self._snapshot.records)} companies)")
+        return True
+
+    def _refresh_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.exception(f"Error refreshing company store: {str(e)}")
+
+    def start_background_refresh(self, interval: float = REFRESH_INTERVAL) -> None:
+        """
+        Start a daemon thread that checks for new mirror data every `interval` seconds
+
+        Args:
+            interval: Seconds between checks
+        """
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval,), name="company-store-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+
+
+def get_company_store(mirror: AirtableMirror) -> CompanyStore:
+    """
+    Get the process-wide company store for a mirror, creating it and starting its
+    background refresh on first use
+
+    Args:
+        mirror: Local mirror the directory is read from
+
+    Returns:
+        Shared CompanyStore instance
+    """
+    with _stores_lock:
+        store = _stores.get(mirror.db_path)
+        if store is None:
+            store = CompanyStore(mirror)
+            store.start_background_refresh()
+            _stores[mirror.db_path] = store
+        return store
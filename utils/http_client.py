@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default (connect, read) timeout in seconds for every outbound request
+DEFAULT_TIMEOUT: Tuple[float, float] = (5, 30)
+
+# Retry settings for transient failures
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Methods that are safe to repeat after the server may have acted on them
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"}
+
+# Requests per second allowed per rate limit key (see rate_limit_key)
+RATE_LIMITS: Dict[str, float] = {
+    "api.airtable.com": 5.0,
+}
+
+# Connection pool sizing for the shared session
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize the token bucket
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens held (defaults to `rate`)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, borrowing against future refills if none is available
+
+        Returns:
+            Seconds the caller must wait before using its token
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it"""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Get the process-wide HTTP session with keep-alive connection pooling
+
+    Returns:
+        Shared requests Session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def rate_limit_key(url: str) -> str:
+    """
+    Get the rate limit key for a URL
+
+    Airtable limits requests per base, so its data API is keyed by host and base ID;
+    every other service is keyed by host alone.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+
+    if host == "api.airtable.com":
+        segments = [segment for segment in parts.path.split("/") if segment]
+        # /v0/{base_id}/... addresses a base, /v0/meta/... does not
+        if len(segments) >= 2 and segments[1] != "meta":
+            return f"{host}/{segments[1]}"
+
+    return host
+
+
+def get_bucket(url: str) -> Optional[TokenBucket]:
+    """
+    Get the process-wide token bucket governing a URL
+
+    Buckets are shared by every caller in the process, sync or async, so all traffic
+    to one rate limit key counts against the same budget.
+
+    Returns:
+        Token bucket, or None if the URL's host is not rate limited
+    """
+    host = urlsplit(url).hostname or ""
+    rate = RATE_LIMITS.get(host)
+    if rate is None:
+        return None
+
+    key = rate_limit_key(url)
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate)
+            _buckets[key] = bucket
+        return bucket
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Get the delay before the next retry, honouring Retry-After when the server sends it
+
+    Args:
+        attempt: Zero-based number of the attempt that just failed
+        retry_after: Retry-After header of the failed response, if any
+
+    Returns:
+        Delay in seconds
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+
+    # Full jitter keeps many clients from retrying in lockstep
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method: str, url: str, timeout: Union[float, Tuple[float, float], None] = None,
+            max_retries: int = MAX_RETRIES, **kwargs) -> requests.Response:
+    """
+    Send an HTTP request through the shared session with rate limiting, retries and a timeout
+
+    Idempotent methods are retried on connection errors and 429/5xx responses. Other
+    methods (e.g. POST) are only retried when the request never reached the server or
+    was rejected with 429, so a webhook is never triggered twice.
+
+    Args:
+        method: HTTP method
+        url: Request URL
+        timeout: Timeout in seconds, or a (connect, read) tuple (defaults to DEFAULT_TIMEOUT)
+        max_retries: Maximum number of retries after the first attempt
+        **kwargs: Additional arguments passed to requests.Session.request
+
+    Returns:
+        The final response (which may still carry an error status)
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails on every attempt
+    """
+    method = method.upper()
+    idempotent = method in IDEMPOTENT_METHODS
+    session = get_session()
+    bucket = get_bucket(url)
+
+    attempt = 0
+    while True:
+        if bucket is not None:
+            bucket.acquire()
+
+        try:
+            response = session.request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Only a connect timeout guarantees the request was never sent, so it is the
+            # sole failure retried for non-idempotent methods
+            retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+            if not retryable or attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt)
+            logging.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.1f}s")
+        else:
+            retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUS_CODES)
+            if not retryable or attempt >= max_retries:
+                return response
+            delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+            logging.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request through the shared transport (see `request`)"""
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """Send a POST request through the shared transport (see `request`)"""
+    return request("POST", url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> requests.Response:
+    """Send a PATCH request through the shared transport (see `request`)"""
+    return request("PATCH", url, **kwargs)
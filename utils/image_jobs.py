@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional, Set
+
+from utils import image_webhook
+from utils.webhook_parser import ImageStatus
+
+# SQLite file holding image generation job state
+JOBS_DB_FILE = os.getenv("IMAGE_JOBS_DB", "image_jobs.db")
+# Maximum number of generations running at once; further jobs wait in the queue
+MAX_WORKERS = 4
+# Seconds between status checks while the webhook is still generating
+POLL_INTERVAL = 5
+# Seconds after which a pending generation is given up on
+POLL_TIMEOUT = 5 * 60
+# Seconds without an update after which an unfinished job is considered lost
+# (e.g. its server process restarted). Running jobs update at least every webhook
+# timeout; queued jobs don't update until a worker is free.
+RUNNING_STALE_AFTER = 5 * 60
+QUEUED_STALE_AFTER = 60 * 60
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+WAITING = "waiting"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING, WAITING)
+
+
+@dataclass(frozen=True)
+class ImageJob:
+    """Snapshot of an image generation job"""
+    id: str
+    company_name: str
+    idea_number: str
+    state: str
+    message: str
+    created_at: float
+    updated_at: float
+    result: Optional[ImageStatus] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, successfully or not"""
+        return self.state not in ACTIVE_STATES
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the job was submitted (until it finished, if it has)"""
+        return (self.updated_at if self.done else time.time()) - self.created_at
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="image-job")
+_submit_lock = threading.Lock()
+# Database files whose schema exists, so it is only created on first use
+_schema_ready: Set[str] = set()
+_schema_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection to the jobs database, creating its schema on first use"""
+    with _schema_lock:
+        if JOBS_DB_FILE not in _schema_ready:
+            _create_schema()
+            _schema_ready.add(JOBS_DB_FILE)
+    return _open()
+
+
+def _open() -> sqlite3.Connection:
+    conn = sqlite3.connect(JOBS_DB_FILE, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _create_schema() -> None:
+    with _open() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                company_name TEXT NOT NULL,
+                idea_number TEXT NOT NULL,
+                description TEXT NOT NULL,
+                state TEXT NOT NULL,
+                message TEXT NOT NULL,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_company ON jobs (company_name, created_at)")
+
+
+def _update(job_id: str, state: str, message: str, result: Optional[ImageStatus] = None) -> None:
+    """Persist a job's new state"""
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE jobs SET state = ?, message = ?, result = ?, updated_at = ? WHERE id = ?",
+            (state, message, json.dumps(result.to_dict()) if result else None, time.time(), job_id)
+        )
+
+
+def _row_to_job(row) -> ImageJob:
+    job = ImageJob(
+        id=row[0], company_name=row[1], idea_number=row[2], state=row[3], message=row[4],
+        result=ImageStatus(**json.loads(row[5])) if row[5] else None,
+        created_at=row[6], updated_at=row[7]
+    )
+    stale_after = QUEUED_STALE_AFTER if job.state == QUEUED else RUNNING_STALE_AFTER
+    if not job.done and time.time() - job.updated_at > stale_after:
+        return dataclasses.replace(job, state=FAILED, message="Generation was interrupted. Please try again.")
+    return job
+
+
+def _run(job_id: str, company_name: str, idea_number: str, description: str) -> None:
+    """Worker: call the webhook, then poll the image status until an image appears"""
+    try:
+        _update(job_id, RUNNING, "Generating AI image based on description...")
+        status = image_webhook.generate_image(company_name, idea_number, description)
+
+        deadline = time.time() + POLL_TIMEOUT
+        while not status.has_image:
+            # An error the webhook reported won't clear by waiting; an unreadable
+            # response may just mean the generation is still running
+            if status.status == "error" and not status.unrecognised:
+                _update(job_id, FAILED, f"Failed to generate image: {status.message or 'the webhook reported an error'}")
+                return
+            if time.time() >= deadline:
+                _update(job_id, FAILED, "Image generation is taking longer than expected. Please check back later.")
+                return
+            _update(job_id, WAITING, "Image is being generated, waiting for it to be saved...")
+            time.sleep(POLL_INTERVAL)
+            status = image_webhook.fetch_image_status(company_name)
+
+        _update(job_id, SUCCEEDED, f"Image ready for idea {status.display_idea}.", status)
+
+    except image_webhook.WebhookError as e:
+        _update(job_id, FAILED, f"Failed to generate image: {str(e)}")
+    except Exception as e:
+        logging.exception(f"Image job {job_id} failed")
+        _update(job_id, FAILED, f"Error generating image: {str(e)}")
+
+
+def get_job(job_id: str) -> Optional[ImageJob]:
+    """
+    Get the current state of a job
+
+    Args:
+        job_id: ID returned by submit
+
+    Returns:
+        Job snapshot or None if no such job exists
+    """
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT id, company_name, idea_number, state, message, result, created_at, updated_at "
+            "FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def get_active_job(company_name: str) -> Optional[ImageJob]:
+    """
+    Get the unfinished job for a company, if any, from any session or server process
+
+    Args:
+        company_name: Name of the company
+
+    Returns:
+        Most recent unfinished job or None
+    """
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT id, company_name, idea_number, state, message, result, created_at, updated_at "
+            f"FROM jobs WHERE company_name = ? AND state IN ({','.join('?' * len(ACTIVE_STATES))}) "
+            "ORDER BY created_at DESC",
+            (company_name, *ACTIVE_STATES)
+        ).fetchall()
+    for row in rows:
+        job = _row_to_job(row)
+        if not job.done:
+            return job
+    return None
+
+
+def submit(company_name: str, idea_number: str, description: str) -> str:
+    """
+    Queue an image generation and return immediately
+
+    Only one image may be generated per company, so if a job for the company is
+    already in progress its ID is returned instead of starting another.
+
+    Args:
+        company_name: Name of the company
+        idea_number: Number of the idea to illustrate
+        description: Description of the idea
+
+    Returns:
+        Job ID to poll with get_job
+    """
+    with _submit_lock:
+        active = get_active_job(company_name)
+        if active is not None:
+            return active.id
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, company_name, idea_number, description, state, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, company_name, str(idea_number), description, QUEUED, "Waiting for a free generator...", now, now)
+            )
+
+    _executor.submit(_run, job_id, company_name, str(idea_number), description)
+    return job_id
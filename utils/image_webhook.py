@@ -0,0 +1,251 @@
+import time
+import threading
+import dataclasses
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import requests
+
+from utils import http_client
+from utils.webhook_parser import ImageStatus, parse_image_status
+
+# Make.com webhook that checks for and generates company images
+WEBHOOK_URL = "https://hook.eu2.make.com/z31ifl3yfwdpu23bgbefzy96q5xr5zun"
+# Generation runs inside the webhook, so allow a longer read timeout
+GENERATE_TIMEOUT = (5, 120)
+
+# Seconds a status with an image stays cached
+STATUS_CACHE_TTL = 10 * 60
+# Seconds a status without an image stays cached; shorter, since another process
+# may generate one in the meantime
+NO_IMAGE_CACHE_TTL = 60
+# Maximum number of companies kept in the status cache
+STATUS_CACHE_MAX_ENTRIES = 5000
+
+
+class WebhookError(Exception):
+    """Raised when the image webhook can't be reached or rejects a request"""
+
+
+class StatusCache:
+    """Thread-safe, TTL-bounded LRU cache of image status by company name, shared across sessions"""
+
+    def __init__(self, max_entries: int = STATUS_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of companies kept; least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[float, ImageStatus]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, company_name: str) -> Optional[ImageStatus]:
+        """
+        Get the cached status for a company
+
+        Args:
+            company_name: Name of the company
+
+        Returns:
+            Cached status, or None if missing or expired
+        """
+        with self.lock:
+            entry = self.entries.get(company_name)
+            if entry is None:
+                return None
+            expires_at, status = entry
+            if time.monotonic() >= expires_at:
+                del self.entries[company_name]
+                return None
+            self.entries.move_to_end(company_name)
+            return status
+
+    def set(self, company_name: str, status: ImageStatus, ttl: Optional[float] = None) -> None:
+        """
+        Cache a status for a company; error statuses are never cached
+
+        Args:
+            company_name: Name of the company
+            status: Status to cache
+            ttl: Seconds to keep it; defaults to STATUS_CACHE_TTL, or NO_IMAGE_CACHE_TTL
+                if the status has no image
+        """
+        if status.status == "error":
+            return
+
+        if ttl is None:
+            ttl = STATUS_CACHE_TTL if status.has_image else NO_IMAGE_CACHE_TTL
+        with self.lock:
+            self.entries[company_name] = (time.monotonic() + ttl, status)
+            self.entries.move_to_end(company_name)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, company_name: Optional[str] = None) -> None:
+        """
+        Drop the cached status for a company, or for every company
+
+        Args:
+            company_name: Name of the company; clears the whole cache if omitted
+        """
+        with self.lock:
+            if company_name is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(company_name, None)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one
+
+    The first caller for a key runs the function; callers arriving while it is in
+    flight wait for it and get the same result (or exception). Nothing is kept once
+    the call completes, so later callers start a fresh call.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, Future] = {}
+        self.lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, or wait for the call already running for key
+
+        Args:
+            key: Identifies calls that may share a result
+            fn: Function to run if no call for key is in flight
+
+        Returns:
+            Result of the (possibly shared) call
+
+        Raises:
+            Whatever the shared call raised
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Future()
+
+        if leader:
+            try:
+                call.set_result(fn())
+            except BaseException as e:
+                call.set_exception(e)
+            finally:
+                with self.lock:
+                    del self.calls[key]
+
+        return call.result()
+
+
+# Process-wide cache shared by every session
+status_cache = StatusCache()
+# Process-wide in-flight webhook calls, keyed by (company_name, idea_number)
+inflight = SingleFlight()
+
+
+def _post(payload: Dict, timeout=None) -> ImageStatus:
+    """Post to the webhook and parse its response, raising WebhookError on failure"""
+    try:
+        response = http_client.post(WEBHOOK_URL, json=payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        raise WebhookError(str(e)) from e
+
+    if response.status_code != 200:
+        raise WebhookError(response.text)
+
+    # The webhook often returns malformed JSON, so use the tolerant parser
+    return parse_image_status(response.text)
+
+
+def fetch_image_status(company_name: str, image_ttl: Optional[float] = None) -> ImageStatus:
+    """
+    Ask the webhook for a company's image status, bypassing and refreshing the cache
+
+    Concurrent checks for the same company share a single webhook call.
+
+    Args:
+        company_name: Name of the company
+        image_ttl: Seconds to cache a status that has an image, instead of
+            STATUS_CACHE_TTL; a status without one always expires after NO_IMAGE_CACHE_TTL
+
+    Returns:
+        Current status
+
+    Raises:
+        WebhookError: If the webhook can't be reached or returns an error
+    """
+    def fetch() -> ImageStatus:
+        # idea_number 0 asks the webhook to only check the status
+        status = _post({"company_name": company_name, "idea_number": 0, "description": ""})
+        status_cache.set(company_name, status, image_ttl if status.has_image else None)
+        return status
+
+    return inflight.do((company_name, "0"), fetch)
+
+
+def check_image_status(company_name: str) -> ImageStatus:
+    """
+    Get a company's image status, served from the shared cache when fresh
+
+    Args:
+        company_name: Name of the company
+
+    Returns:
+        Image status; status is "error" (and nothing is cached) if the webhook failed
+    """
+    cached = status_cache.get(company_name)
+    if cached is not None:
+        return cached
+
+    try:
+        return fetch_image_status(company_name)
+    except WebhookError as e:
+        return ImageStatus.error(f"Error: {str(e)}")
+    except Exception as e:
+        return ImageStatus.error(f"Exception: {str(e)}")
+
+
+def generate_image(company_name: str, idea_number: str, description: str) -> ImageStatus:
+    """
+    Ask the webhook to generate an image for one of a company's ideas
+
+    The shared status cache is updated as soon as the webhook reports an image
+    ("success" or "exists"), so every session sees it on its next check. Concurrent
+    requests for the same company and idea share a single webhook call.
+
+    Args:
+        company_name: Name of the company
+        idea_number: Number of the idea to illustrate
+        description: Description of the idea
+
+    Returns:
+        Status reported by the webhook
+
+    Raises:
+        WebhookError: If the webhook can't be reached or returns an error
+    """
+    def generate() -> ImageStatus:
+        payload = {
+            "idea_number": idea_number,
+            "description": description,
+            "company_name": company_name
+        }
+        status = _post(payload, timeout=GENERATE_TIMEOUT)
+
+        if status.status == "success":
+            # A fresh generation has no chosen idea yet; the generated one is the choice
+            status = dataclasses.replace(status, idea_chosen=status.idea_chosen or status.idea_number)
+        if status.has_image:
+            status_cache.set(company_name, status)
+        else:
+            # Generation is still running; make the next check ask the webhook again
+            status_cache.invalidate(company_name)
+        return status
+
+    return inflight.do((company_name, str(idea_number)), generate)
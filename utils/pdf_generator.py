@@ -1,10 +1,225 @@
 import io
-from typing import List, Optional
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
 from fpdf import FPDF
-import requests
+from utils import http_client
 import tempfile
 from datetime import datetime
 
+# Total size of the PDFs kept in the shared cache
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Maximum number of PDFs built at once in the background
+PDF_BUILD_WORKERS = 2
+# Maximum number of images downloaded at once for one PDF
+IMAGE_PREFETCH_WORKERS = 6
+# Connect and read timeouts for image downloads; with one retry, these bound how
+# long a PDF waits for its slowest image
+IMAGE_TIMEOUT = (5, 20)
+IMAGE_MAX_RETRIES = 1
+
+# PDF build states
+PDF_MISSING = "missing"
+PDF_BUILDING = "building"
+PDF_READY = "ready"
+PDF_FAILED = "failed"
+
+class PdfCache:
+    """Thread-safe LRU cache of generated PDFs, bounded by total size and shared across sessions"""
+    
+    def __init__(self, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        """
+        Initialize the cache
+        
+        Args:
+            max_bytes: Maximum total size of the cached PDFs; least recently used are evicted
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def key(company_name: str, images: List[str], descriptions: Optional[List[str]] = None,
+            header_image_url: Optional[str] = None) -> str:
+        """
+        Hash everything that determines a PDF's content
+        
+        The date is included because it is printed in the footer.
+        """
+        content = [company_name, images, descriptions or [], header_image_url or "", datetime.now().strftime("%Y-%m-%d")]
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a cached PDF
+        
+        Args:
+            key: Content key from PdfCache.key
+        
+        Returns:
+            PDF bytes or None if not cached
+        """
+        with self.lock:
+            pdf_bytes = self.entries.get(key)
+            if pdf_bytes is not None:
+                self.entries.move_to_end(key)
+            return pdf_bytes
+    
+    def set(self, key: str, pdf_bytes: bytes) -> None:
+        """
+        Cache a PDF; one larger than the whole budget is not cached
+        
+        Args:
+            key: Content key from PdfCache.key
+            pdf_bytes: Generated PDF
+        """
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = pdf_bytes
+            self.size += len(pdf_bytes)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+# Process-wide cache shared by every session
+pdf_cache = PdfCache()
+
+@dataclass(frozen=True)
+class PdfBuild:
+    """State of a background PDF build"""
+    state: str
+    pdf_bytes: Optional[bytes] = None
+    error: str = ""
+
+_build_executor = ThreadPoolExecutor(max_workers=PDF_BUILD_WORKERS, thread_name_prefix="pdf-build")
+_builds_lock = threading.Lock()
+_building: Set[str] = set()
+_build_errors: Dict[str, str] = {}
+
+def _build(key: str, company_name: str, images: List[str], descriptions: Optional[List[str]],
+           header_image_url: Optional[str]) -> None:
+    """Worker: generate a PDF into the shared cache"""
+    try:
+        pdf_cache.set(key, generate_pdf(company_name, images, descriptions, header_image_url).getvalue())
+    except Exception as e:
+        logging.exception(f"Failed to build PDF for {company_name}")
+        with _builds_lock:
+            _build_errors[key] = str(e)
+    finally:
+        with _builds_lock:
+            _building.discard(key)
+
+def prepare_pdf(company_name: str, images: List[str], descriptions: Optional[List[str]] = None,
+                header_image_url: Optional[str] = None) -> str:
+    """
+    Start building a PDF in the background and return immediately
+    
+    Nothing is started if the PDF is already cached or being built, so sessions
+    asking for the same content share one build.
+    
+    Args:
+        company_name: Name of the company
+        images: List of image URLs for generated images
+        descriptions: List of idea descriptions (title, description, purpose)
+        header_image_url: URL of the header image (banner)
+        
+    Returns:
+        Content key to poll with get_pdf_build
+    """
+    key = PdfCache.key(company_name, images, descriptions, header_image_url)
+    with _builds_lock:
+        if key in _building or pdf_cache.get(key) is not None:
+            return key
+        _building.add(key)
+        _build_errors.pop(key, None)
+    _build_executor.submit(_build, key, company_name, images, descriptions, header_image_url)
+    return key
+
+def get_pdf_build(key: str) -> PdfBuild:
+    """
+    Get the state of a PDF without building it
+    
+    Args:
+        key: Content key from PdfCache.key or prepare_pdf
+        
+    Returns:
+        Build state, with the PDF bytes once ready or the error if the build failed
+    """
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is not None:
+        return PdfBuild(PDF_READY, pdf_bytes=pdf_bytes)
+    with _builds_lock:
+        if key in _building:
+            return PdfBuild(PDF_BUILDING)
+        if key in _build_errors:
+            # Kept until the next prepare_pdf, so every reader sees the failure
+            return PdfBuild(PDF_FAILED, error=_build_errors[key])
+    return PdfBuild(PDF_MISSING)
+
+def get_pdf(company_name: str, images: List[str], descriptions: Optional[List[str]] = None,
+            header_image_url: Optional[str] = None) -> bytes:
+    """
+    Get the PDF for a company's ideas, generating it only if an identical one isn't cached
+    
+    Args:
+        company_name: Name of the company
+        images: List of image URLs for generated images
+        descriptions: List of idea descriptions (title, description, purpose)
+        header_image_url: URL of the header image (banner)
+        
+    Returns:
+        PDF bytes
+    """
+    key = PdfCache.key(company_name, images, descriptions, header_image_url)
+    pdf_bytes = pdf_cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = generate_pdf(company_name, images, descriptions, header_image_url).getvalue()
+        pdf_cache.set(key, pdf_bytes)
+    return pdf_bytes
+
+def _fetch_image(url: str) -> Optional[bytes]:
+    """Download one image, returning None if it can't be fetched"""
+    try:
+        response = http_client.get(url, timeout=IMAGE_TIMEOUT, max_retries=IMAGE_MAX_RETRIES)
+        response.raise_for_status()
+        return response.content
+    except Exception as e:
+        logging.warning(f"Could not download image {url}: {str(e)}")
+        return None
+
+def prefetch_images(urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+    """
+    Download images concurrently
+    
+    Args:
+        urls: Image URLs; duplicates and empty values are skipped
+        
+    Returns:
+        Image bytes by URL, or None for images that couldn't be fetched
+    """
+    unique_urls = [url for url in dict.fromkeys(urls) if url]
+    if not unique_urls:
+        return {}
+    workers = min(IMAGE_PREFETCH_WORKERS, len(unique_urls))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-image") as executor:
+        return dict(zip(unique_urls, executor.map(_fetch_image, unique_urls)))
+
+def _write_temp_image(image_bytes: bytes) -> str:
+    """Save image bytes to a temporary file for FPDF and return its path"""
+    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
+        temp_file.write(image_bytes)
+        return temp_file.name
+
 def generate_pdf(company_name: str, images: List[str], descriptions: Optional[List[str]] = None, 
                header_image_url: Optional[str] = None) -> io.BytesIO:
     """
@@ -19,6 +234,10 @@ def generate_pdf(company_name: str, images: List[str], descriptions: Optional[Li
     Returns:
         BytesIO object containing the generated PDF
     """
+    # Download the header and every image up front, in parallel, so the layout below
+    # only waits for the slowest image rather than the sum of all of them
+    image_data = prefetch_images([header_image_url or ""] + list(images or []))
+    
     # Create PDF with professional settings
     class PDF(FPDF):
         def header(self):
@@ -72,14 +291,13 @@ def generate_pdf(company_name: str, images: List[str], descriptions: Optional[Li
     # Add header banner image if provided
     if header_image_url:
         try:
-            # Download image from URL
-            response = requests.get(header_image_url)
-            response.raise_for_status()
+            # Use the prefetched image
+            header_bytes = image_data.get(header_image_url)
+            if header_bytes is None:
+                raise ValueError("Header image could not be downloaded")
             
             # Save image to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_file_path = temp_file.name
+            temp_file_path = _write_temp_image(header_bytes)
             
             # Calculate appropriate width while maintaining aspect ratio
             max_width = 180
@@ -181,14 +399,13 @@ def generate_pdf(company_name: str, images: List[str], descriptions: Optional[Li
         
         for i, img_url in enumerate(images):
             try:
-                # Download image from URL
-                response = requests.get(img_url)
-                response.raise_for_status()
+                # Use the prefetched image
+                img_bytes = image_data.get(img_url)
+                if img_bytes is None:
+                    raise ValueError("Image could not be downloaded")
                 
                 # Save image to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-                    temp_file.write(response.content)
-                    temp_file_path = temp_file.name
+                temp_file_path = _write_temp_image(img_bytes)
                 
                 # Add a caption for the image
                 pdf.set_font('Arial', 'B', 11)
@@ -0,0 +1,128 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional
+
+from utils import image_webhook
+from utils.http_client import TokenBucket
+
+# Concurrent status checks during a pre-warm
+PREWARM_WORKERS = 8
+# Status checks per second during a pre-warm. Kept separate from the interactive
+# requests so a bulk run never delays a visitor's own check.
+PREWARM_RATE = float(os.getenv("IMAGE_STATUS_PREWARM_RATE", "5"))
+# Seconds between scheduled pre-warms. Off (0) unless configured, since each run
+# makes one webhook call per company.
+PREWARM_INTERVAL = float(os.getenv("IMAGE_STATUS_PREWARM_INTERVAL", "0"))
+# Log progress every this many companies
+PROGRESS_LOG_EVERY = 100
+
+_prewarm_thread: Optional[threading.Thread] = None
+_prewarm_lock = threading.Lock()
+# Report of the most recent completed pre-warm in this process
+last_report: Optional["PrewarmReport"] = None
+
+
+@dataclass
+class PrewarmReport:
+    """Outcome of one pre-warm run"""
+    total: int = 0
+    checked: int = 0
+    with_image: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        """Seconds the run took"""
+        return self.finished_at - self.started_at
+
+
+def _check(company_name: str, bucket: TokenBucket, image_ttl: Optional[float]) -> bool:
+    """Check one company's status, respecting the pre-warm rate limit"""
+    delay = bucket.reserve()
+    if delay > 0:
+        time.sleep(delay)
+    return image_webhook.fetch_image_status(company_name, image_ttl).has_image
+
+
+def prewarm_status_cache(company_names: Iterable[str], max_workers: int = PREWARM_WORKERS,
+                         rate: float = PREWARM_RATE, image_ttl: Optional[float] = None,
+                         on_progress: Optional[Callable[[int, int], None]] = None) -> PrewarmReport:
+    """
+    Check the image status of every company and store the results in the shared status cache
+
+    Args:
+        company_names: Companies to check
+        max_workers: Maximum number of checks in flight
+        rate: Maximum checks started per second
+        image_ttl: Seconds to cache each status that has an image, instead of the
+            StatusCache default; statuses without one keep their short TTL
+        on_progress: Called with (done, total) after each company
+
+    Returns:
+        Counts of checked companies and images found, and the error for each failure
+    """
+    names = list(dict.fromkeys(company_names))
+    report = PrewarmReport(total=len(names), started_at=time.time())
+    bucket = TokenBucket(rate)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="status-prewarm") as executor:
+        futures = {executor.submit(_check, name, bucket, image_ttl): name for name in names}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                report.with_image += future.result()
+                report.checked += 1
+            except Exception as e:
+                report.failures[name] = str(e)
+
+            if on_progress is not None:
+                on_progress(done, report.total)
+            if done % PROGRESS_LOG_EVERY == 0:
+                logging.info(f"Image status pre-warm: {done}/{report.total} companies checked")
+
+    report.finished_at = time.time()
+    logging.info(
+        f"Image status pre-warm finished in {report.duration:.1f}s: {report.checked} checked, "
+        f"{report.with_image} with images, {len(report.failures)} failed"
+    )
+    return report
+
+
+def _prewarm_loop(get_company_names: Callable[[], Iterable[str]], interval: float) -> None:
+    global last_report
+    while True:
+        try:
+            # Keep found images until the next run has had time to refresh them
+            last_report = prewarm_status_cache(get_company_names(), image_ttl=interval * 2)
+        except Exception:
+            logging.exception("Image status pre-warm failed")
+        time.sleep(interval)
+
+
+def start_background_prewarm(get_company_names: Callable[[], Iterable[str]],
+                             interval: float = PREWARM_INTERVAL) -> None:
+    """
+    Start a daemon thread that pre-warms the status cache now and then every `interval` seconds
+
+    Only one pre-warm thread runs per process; later calls do nothing.
+
+    Args:
+        get_company_names: Returns the companies to check; called before each run
+        interval: Seconds between runs; 0 (the default) disables pre-warming
+    """
+    global _prewarm_thread
+    if interval <= 0:
+        return
+    with _prewarm_lock:
+        if _prewarm_thread is not None and _prewarm_thread.is_alive():
+            return
+        _prewarm_thread = threading.Thread(
+            target=_prewarm_loop, args=(get_company_names, interval), name="status-prewarm", daemon=True
+        )
+        _prewarm_thread.start()
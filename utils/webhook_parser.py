@@ -0,0 +1,123 @@
+import re
+import json
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, Any
+
+# One "key": value pair. String values may contain escaped quotes and raw control
+# characters; pairs need not be separated by commas. Everything between pairs
+# (braces, commas, stray whitespace) is skipped.
+_PAIR_RE = re.compile(
+    r'"(?P<key>[^"\\]*(?:\\.[^"\\]*)*)"\s*:\s*'
+    r'(?:"(?P<string>[^"\\]*(?:\\.[^"\\]*)*)"|(?P<number>-?\d+(?:\.\d+)?)|(?P<literal>true|false|null))',
+    re.DOTALL
+)
+_CONTROL_CHARS_RE = re.compile(r"[\x00-\x1f]")
+# Start of the error message for a response no status could be read from
+UNRECOGNISED_RESPONSE = "Unrecognised webhook response"
+
+
+@dataclass(frozen=True)
+class ImageStatus:
+    """Image generation status for a company as reported by the Make.com webhook"""
+    status: str
+    company_name: str = ""
+    idea_number: str = ""
+    idea_chosen: str = ""
+    image_url: str = ""
+    file_name: str = ""
+    generated_date: str = ""
+    message: str = ""
+
+    @property
+    def has_image(self) -> bool:
+        """Whether the webhook returned an image for the company"""
+        return self.status in ("success", "exists")
+
+    @property
+    def unrecognised(self) -> bool:
+        """Whether this is an error for a response that could not be read, not one the webhook reported"""
+        return self.status == "error" and self.message.startswith(UNRECOGNISED_RESPONSE)
+
+    @property
+    def display_idea(self) -> str:
+        """The idea the image belongs to: idea_chosen if set, otherwise idea_number"""
+        return self.idea_chosen or self.idea_number
+
+    @classmethod
+    def error(cls, message: str) -> "ImageStatus":
+        """Create an error status with a message"""
+        return cls(status="error", message=message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict (e.g. for session state)"""
+        return asdict(self)
+
+
+def _unescape(raw: str) -> str:
+    """Decode a JSON string body, dropping raw control characters the webhook leaks into values"""
+    cleaned = _CONTROL_CHARS_RE.sub("", raw)
+    try:
+        return json.loads(f'"{cleaned}"')
+    except json.JSONDecodeError:
+        return cleaned
+
+
+def _tokenize(text: str) -> Dict[str, Any]:
+    """Extract top-level-looking key/value pairs from malformed JSON in a single pass"""
+    fields = {}
+    for match in _PAIR_RE.finditer(text):
+        key = _unescape(match.group("key"))
+        if key in fields:
+            continue
+        if match.group("string") is not None:
+            fields[key] = _unescape(match.group("string"))
+        elif match.group("number") is not None:
+            fields[key] = match.group("number")
+        else:
+            fields[key] = {"true": True, "false": False, "null": None}[match.group("literal")]
+    return fields
+
+
+def _text(value: Any) -> str:
+    """Normalize a payload value to a string, treating missing values as empty"""
+    if value is None:
+        return ""
+    return str(value)
+
+
+def parse_image_status(text: str) -> ImageStatus:
+    """
+    Parse a (possibly malformed) webhook response into an ImageStatus
+
+    Well-formed JSON goes through json.loads. Anything else is read by a single-pass
+    tokenizer that tolerates missing commas and raw newlines or tabs inside string
+    values, so parse cost stays linear in the payload size.
+
+    Args:
+        text: Response body from the webhook
+
+    Returns:
+        Parsed status; status is "error" if no status field could be found
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict):
+        data = _tokenize(text)
+
+    if not data.get("status"):
+        return ImageStatus.error(f"{UNRECOGNISED_RESPONSE}: {text[:200]}")
+
+    return ImageStatus(
+        status=_text(data.get("status")),
+        company_name=_text(data.get("company_name")),
+        idea_number=_text(data.get("idea_number")),
+        idea_chosen=_text(data.get("idea_chosen")),
+        # We get Airtable URLs directly, so only the ampersand encoding needs fixing
+        image_url=_text(data.get("image_url")).replace("&amp;", "&"),
+        file_name=_text(data.get("file_name")),
+        generated_date=_text(data.get("generated_date")) or datetime.now().strftime("%Y-%m-%d"),
+        message=_text(data.get("message"))
+    )